@@ -0,0 +1,65 @@
+import random
+
+import numpy as np
+import pygame
+
+from palette import desaturate_pixels, gray_offsets
+
+
+# Backgrounds are drawn from this many seeds, so a disk cache ends up
+# holding every one of them
+BACKGROUND_VARIANTS = 16
+
+class FadingBackground:
+    """A background drawn once from a seed, then faded toward gray per level"""
+
+    def __init__(self, draw_background, size, seed=None, levels=31, max_cached=8, disk_cache=None, art=()):
+        # draw_background(surface, color_intensity, rng) draws the full color background
+        self.draw_background = draw_background
+        self.size = size
+        self.seed = seed
+        self.levels = levels
+        self.max_cached = max_cached
+        # An optional SurfaceCache; art names the game and its art version
+        self.disk_cache = disk_cache
+        self.art = art
+        self.cache = {}
+        self.base = None
+        self.to_gray = None
+
+    def draw_base(self):
+        # Only needed for levels that aren't on disk yet
+        if self.base is None:
+            base = pygame.Surface(self.size)
+            self.draw_background(base, 0, random.Random(self.seed))
+            self.base = pygame.surfarray.array3d(base).astype(np.float32)
+            # How far each pixel is from its own gray, so a fade is one multiply-add
+            self.to_gray = gray_offsets(self.base)
+
+    def level(self, color_intensity):
+        return int(round(min(max(color_intensity, 0), 1) * (self.levels - 1)))
+
+    def fade(self, level):
+        self.draw_base()
+        intensity = level / (self.levels - 1) if self.levels > 1 else 0
+        pixels = desaturate_pixels(self.base, intensity, self.to_gray)
+        return pygame.surfarray.make_surface(pixels)
+
+    def surface(self, color_intensity):
+        level = self.level(color_intensity)
+        if level in self.cache:
+            return self.cache[level]
+
+        if self.disk_cache is None:
+            surface = self.fade(level)
+        else:
+            key = ("background",) + tuple(self.art) + (self.seed, tuple(self.size), level, self.levels)
+            surface = self.disk_cache.surface(key, lambda: self.fade(level))
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+
+        if len(self.cache) >= self.max_cached:
+            # Drop the level made longest ago
+            del self.cache[next(iter(self.cache))]
+        self.cache[level] = surface
+        return surface
@@ -0,0 +1,113 @@
+import argparse
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from bug_collecting import BUG_COLORS, HEIGHT, RULES, RULES_FILE, WIDTH
+from game_rules import load_rules
+from headless import HeadlessSession, RandomClicker
+
+# Frames per second the game runs at, for turning frame counts into seconds
+FPS = 60
+
+def run_seed(task):
+    """Play one seeded session; runs in a worker process"""
+    seed, max_frames, every, miss, rules = task
+    policy = RandomClicker(random.Random(f"policy-{seed}"), every=every, miss=miss)
+    return HeadlessSession(seed, policy, rules=rules).run(max_frames)
+
+def summarize(values):
+    if not values:
+        return {"count": 0}
+    values = np.array(values, dtype=float)
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {
+        "count": len(values),
+        "mean": float(values.mean()),
+        "min": float(values.min()),
+        "p50": float(p50),
+        "p90": float(p90),
+        "p99": float(p99),
+        "max": float(values.max()),
+    }
+
+class BatchStats:
+    """Running totals over session results, fed in seed order"""
+
+    def __init__(self, rules=RULES):
+        self.sessions = 0
+        self.clicks = 0
+        self.hits = {bug_type: 0 for bug_type in rules.bug_types}
+        self.hit_ratios = []
+        self.milestone_frames = {str(score): [] for score in (rules.break_score, rules.win_score)
+                                 if score is not None}
+
+    def add(self, result):
+        self.sessions += 1
+        self.clicks += result["clicks"]
+        for bug_type, count in result["hits"].items():
+            self.hits[bug_type] += count
+        self.hit_ratios.append(result["hit_ratio"])
+        for score, frame in result["milestone_frames"].items():
+            self.milestone_frames.setdefault(score, []).append(frame)
+
+    def summary(self):
+        total_hits = sum(self.hits.values())
+        return {
+            "sessions": self.sessions,
+            "clicks": self.clicks,
+            "hits": dict(self.hits),
+            "hit_ratio": total_hits / self.clicks if self.clicks else 0.0,
+            "session_hit_ratio": summarize(self.hit_ratios),
+            "seconds_to_score": {
+                score: summarize([frame / FPS for frame in frames])
+                for score, frames in self.milestone_frames.items()
+            },
+        }
+
+def run_batch(seeds, out_path, workers=None, max_frames=100000, every=20, miss=15.0, rules=RULES):
+    """Run one session per seed and stream results to out_path as JSON lines"""
+    tasks = [(seed, max_frames, every, miss, rules) for seed in seeds]
+    workers = workers or os.cpu_count() or 1
+    # Results come back in seed order whatever the worker count, so the
+    # output file and the summary are the same for the same seed list
+    chunksize = max(1, len(tasks) // (workers * 16))
+    stats = BatchStats(rules)
+    with open(out_path, "w") as out:
+        if workers == 1:
+            for result in map(run_seed, tasks):
+                out.write(json.dumps(result) + "\n")
+                stats.add(result)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for result in pool.map(run_seed, tasks, chunksize=chunksize):
+                    out.write(json.dumps(result) + "\n")
+                    stats.add(result)
+    return stats.summary()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Monte Carlo playthroughs of the bug collecting game")
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--max-frames", type=int, default=100000, help="frame limit per session")
+    parser.add_argument("--every", type=int, default=20, help="frames between the policy's clicks")
+    parser.add_argument("--miss", type=float, default=15.0, help="click spread in pixels")
+    parser.add_argument("--out", default="playthroughs.jsonl", help="per-session results")
+    parser.add_argument("--summary", default=None, help="also write the summary here")
+    parser.add_argument("--rules", default=RULES_FILE, help="rules file to play by")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    seeds = range(args.first_seed, args.first_seed + args.sessions)
+    summary = run_batch(seeds, args.out, args.workers, args.max_frames, args.every, args.miss,
+                        load_rules(args.rules, BUG_COLORS, WIDTH, HEIGHT))
+    text = json.dumps(summary, indent=2)
+    if args.summary:
+        with open(args.summary, "w") as f:
+            f.write(text + "\n")
+    print(text)
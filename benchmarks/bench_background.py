@@ -0,0 +1,43 @@
+import random
+
+import pygame
+import pytest
+
+import bug_collecting
+from backgrounds import FadingBackground
+from tiled_background import generate_background
+
+INTENSITIES = [0, 0.5, 1]
+
+@pytest.mark.parametrize("color_intensity", INTENSITIES)
+def test_draw_background(benchmark, display, color_intensity):
+    surface = pygame.Surface((800, 600))
+    benchmark(bug_collecting.draw_background, surface, color_intensity, random.Random(0))
+
+def test_draw_background_target_game(benchmark, display, target_game):
+    surface = pygame.Surface((800, 600))
+    benchmark(target_game.draw_background, surface)
+
+@pytest.mark.parametrize("size", [(800, 600), (3840, 2160)], ids=["800x600", "4k"])
+def test_generate_background(benchmark, size):
+    # One worker: the tiling alone, without process start-up in the timing
+    benchmark(generate_background, size, 0, 1)
+
+@pytest.mark.parametrize("color_intensity", INTENSITIES)
+def test_fade_background_level(benchmark, display, color_intensity):
+    background = FadingBackground(bug_collecting.draw_background, (800, 600), seed=0)
+
+    def fade():
+        # Time making the level, not fetching it from the cache
+        background.cache.clear()
+        background.surface(color_intensity)
+    benchmark(fade)
+
+def test_desaturate_color(benchmark):
+    colors = [tuple(random.Random(i).randint(0, 255) for _ in range(3)) for i in range(1000)]
+    intensities = [i / 999 for i in range(1000)]
+
+    def desaturate_all():
+        for color, intensity in zip(colors, intensities):
+            bug_collecting.desaturate_color(color, intensity)
+    benchmark(desaturate_all)
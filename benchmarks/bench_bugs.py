@@ -0,0 +1,97 @@
+import random
+
+import pytest
+
+import bug_collecting
+from bug_sprites import SpriteAtlas
+from bug_swarm import BugSwarm
+from helpers import SWARM_SIZES, fill_swarm
+
+def click_points(count=20, seed=1):
+    rng = random.Random(seed)
+    return [(rng.uniform(0, 800), rng.uniform(0, 600)) for _ in range(count)]
+
+@pytest.fixture(params=["target", "collecting"])
+def bug_types(request, target_game):
+    if request.param == "target":
+        return target_game.BUG_TYPES, target_game.Bug, target_game.draw_bug, 1
+    return bug_collecting.BUG_TYPES, bug_collecting.Bug, bug_collecting.draw_bug, 31
+
+@pytest.mark.parametrize("count", SWARM_SIZES)
+def test_swarm_update(benchmark, bug_types, count):
+    types, view_class, _, _ = bug_types
+    swarm = fill_swarm(BugSwarm(types, 800, 600, view_class=view_class), count)
+    benchmark(swarm.update)
+
+@pytest.mark.parametrize("count", SWARM_SIZES)
+def test_swarm_draw(benchmark, display, bug_types, count):
+    types, view_class, draw_bug, levels = bug_types
+    swarm = fill_swarm(BugSwarm(types, 800, 600, view_class=view_class), count, color_intensity=0.5)
+    sprites = SpriteAtlas(draw_bug, levels)
+    # Render the sprites before timing starts
+    sprites.draw_swarm(display, swarm)
+    benchmark(sprites.draw_swarm, display, swarm)
+
+@pytest.mark.parametrize("count", [15, 100, 1000])
+def test_bug_view_draw(benchmark, display, bug_types, count):
+    # Drawing each bug from primitives, the way it was done before the atlas
+    types, view_class, _, _ = bug_types
+    swarm = fill_swarm(BugSwarm(types, 800, 600, view_class=view_class), count)
+
+    def draw_all():
+        for bug in swarm:
+            bug.draw(display)
+    benchmark(draw_all)
+
+@pytest.mark.parametrize("count", SWARM_SIZES)
+def test_swarm_bug_at(benchmark, bug_types, count):
+    types, view_class, _, _ = bug_types
+    swarm = fill_swarm(BugSwarm(types, 800, 600, view_class=view_class), count)
+    points = click_points()
+
+    def click_all():
+        # A step between batches, so the grid's upkeep in update() is paid too
+        swarm.update()
+        for point in points:
+            swarm.bug_at(point)
+    benchmark(click_all)
+
+@pytest.mark.parametrize("batched", [False, True], ids=["each", "batched"])
+@pytest.mark.parametrize("count", SWARM_SIZES)
+def test_swarm_click_burst(benchmark, bug_types, count, batched):
+    # One frame's burst of clicks, catching whatever they hit, one at a time
+    # or worked out together by collect_rows()
+    types, view_class, _, _ = bug_types
+    points = click_points(30)
+
+    def setup():
+        swarm = fill_swarm(BugSwarm(types, 800, 600, view_class=view_class), count)
+        # A step files the new bugs in the grid, as earlier frames would have
+        swarm.update()
+        return (swarm,), {}
+
+    def click_all(swarm):
+        if batched:
+            for row in swarm.collect_rows(points):
+                if row is not None:
+                    swarm.remove(row)
+        else:
+            for point in points:
+                bug = swarm.bug_at(point)
+                if bug is not None:
+                    swarm.remove(bug.index)
+    benchmark.pedantic(click_all, setup=setup, rounds=5)
+
+@pytest.mark.parametrize("count", [15, 100, 1000])
+def test_bug_view_is_clicked(benchmark, bug_types, count):
+    # A linear scan with Bug.is_clicked, the way clicks were checked before the grid
+    types, view_class, _, _ = bug_types
+    swarm = fill_swarm(BugSwarm(types, 800, 600, view_class=view_class), count)
+    points = click_points()
+
+    def click_all():
+        for point in points:
+            for bug in reversed(swarm):
+                if bug.is_clicked(point):
+                    break
+    benchmark(click_all)
@@ -0,0 +1,57 @@
+import random
+
+import pygame
+
+from bug_sprites import SpriteAtlas
+from headless import HeadlessSession
+
+def playing_session(seed=0):
+    """A headless session a few seconds into a game"""
+    session = HeadlessSession(seed)
+    session.game.start()
+    for _ in range(120):
+        session.game.step()
+    return session
+
+def test_headless_frame(benchmark):
+    session = playing_session()
+    game = session.game
+    policy = session.policy
+
+    def frame():
+        for action in policy(game, session.frame):
+            session.apply(action)
+        game.step()
+        session.frame += 1
+        # Keep the game going instead of stopping at the win
+        if game.game_won:
+            game.restart()
+            game.start()
+    benchmark(frame)
+
+def test_headless_session(benchmark):
+    seeds = iter(range(1000000))
+    benchmark(lambda: HeadlessSession(next(seeds)).run())
+
+def test_rendered_frame(benchmark, display, collecting_game):
+    # A whole frame of the bug collecting game drawn on the dummy video driver
+    module = collecting_game
+    session = playing_session()
+    game = session.game
+    sprites = SpriteAtlas(module.draw_bug, levels=31)
+    background = module.FadingBackground(module.draw_background, (800, 600), game.background_seed)
+    # Fonts are normally loaded by init_display()
+    module.font = pygame.font.Font(None, 48)
+    rng = random.Random(0)
+
+    def frame():
+        game.step()
+        game.click((rng.uniform(0, 800), rng.uniform(0, 600)))
+        if game.game_won:
+            game.restart()
+            game.start()
+        display.blit(background.surface(game.color_intensity), (0, 0))
+        sprites.draw_swarm(display, game.bugs)
+        module.draw_score(display, game.score)
+        pygame.display.flip()
+    benchmark(frame)
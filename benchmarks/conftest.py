@@ -0,0 +1,97 @@
+"""Benchmarks for the hot paths of both clicker games
+
+The files are named bench_*.py so a plain pytest run skips them; pass them
+explicitly:
+
+    python -m pytest benchmarks/bench_*.py
+
+Every run writes its results to results.json in the benchmark storage,
+which is .benchmarks/ at the top of the repo unless --benchmark-storage
+says otherwise. The first run on a machine (per OS, Python version and
+word size) is also stored there as that machine's baseline, and every
+later run is compared against it. Timings drift from run to run, so a
+slower comparison only fails the run when asked to:
+
+    python -m pytest benchmarks/bench_*.py --benchmark-gate
+
+fails if any benchmark's median got more than 20% slower. Delete the
+*_baseline.json file to take a new baseline. Any of --benchmark-json,
+--benchmark-compare and --benchmark-compare-fail given on the command
+line replace these defaults.
+"""
+import importlib.util
+import os
+import sys
+from pathlib import Path
+
+# Must be set before pygame is imported anywhere
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Where results and baselines go when --benchmark-storage isn't given,
+# whatever directory pytest is run from
+STORAGE = os.path.join(ROOT, ".benchmarks")
+DEFAULT_STORAGE = "file://./.benchmarks"
+BASELINE = "baseline"
+# How much slower than the baseline counts as a regression with --benchmark-gate
+COMPARE_FAIL = "median:20%"
+
+def pytest_addoption(parser):
+    parser.addoption("--benchmark-gate", action="store_true",
+                     help=f"fail if a benchmark is slower than this machine's baseline by {COMPARE_FAIL}")
+
+def pytest_configure(config):
+    # Runs before pytest-benchmark reads its options (it configures last)
+    from pytest_benchmark.utils import get_machine_id, parse_compare_fail
+
+    option = config.option
+    if option.benchmark_storage == DEFAULT_STORAGE:
+        option.benchmark_storage = "file://" + STORAGE
+    if not option.benchmark_storage.startswith("file://"):
+        # Results kept elsewhere are compared however the user asks
+        return
+    storage = option.benchmark_storage[len("file://"):]
+    if not option.benchmark_json:
+        os.makedirs(storage, exist_ok=True)
+        option.benchmark_json = Path(storage, "results.json")
+    if option.benchmark_compare or option.benchmark_save or option.benchmark_autosave:
+        return
+    if list(Path(storage, get_machine_id()).glob(f"*_{BASELINE}.json")):
+        option.benchmark_compare = f"*_{BASELINE}"
+        if option.benchmark_gate and not option.benchmark_compare_fail:
+            option.benchmark_compare_fail = [parse_compare_fail(COMPARE_FAIL)]
+    else:
+        # Nothing to compare with yet, so this run becomes the baseline
+        option.benchmark_save = BASELINE
+
+def load_game(filename):
+    """Import one of the game scripts; their file names have spaces in them"""
+    spec = importlib.util.spec_from_file_location(filename[:-3].replace(" ", "_"),
+                                                  os.path.join(ROOT, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@pytest.fixture(scope="session")
+def display():
+    pygame.init()
+    screen = pygame.display.set_mode((800, 600))
+    yield screen
+    pygame.quit()
+
+@pytest.fixture(scope="session")
+def target_game():
+    return load_game("bugs target click.py")
+
+@pytest.fixture(scope="session")
+def collecting_game():
+    return load_game("ethical bug game title.py")
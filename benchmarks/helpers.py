@@ -0,0 +1,13 @@
+import random
+
+SWARM_SIZES = [15, 100, 1000, 10000]
+
+def fill_swarm(swarm, count, seed=0, color_intensity=0):
+    """Spawn count bugs of random types at random places"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        bug_type = rng.choice(swarm.type_names)
+        x = rng.randint(50, swarm.width - 50)
+        y = rng.randint(50, swarm.height - 50)
+        swarm.spawn(bug_type, x, y, color_intensity, rng)
+    return swarm
@@ -0,0 +1,304 @@
+import math
+import os
+import random
+from itertools import groupby
+
+import pygame
+
+from bug_swarm import BugSwarm, BugView
+from game_rules import RULES_DIR, load_rules, pick_bug_type, with_max_bugs
+from palette import Palette
+
+# Play field
+WIDTH, HEIGHT = 800, 600
+BLACK = (0, 0, 0)
+BROWN = (101, 67, 33)
+# Names this game's art in the disk cache; bump it whenever the bug or
+# background drawing changes, so stale pictures are drawn again
+ART = ("bug collecting", 1)
+
+# Bug art colors; everything else about each bug is in the rules file
+BUG_COLORS = {
+    "ant": (139, 69, 19),
+    "beetle": (0, 0, 0),
+    "ladybug": (220, 20, 60),
+}
+
+# Sizes, scores, spawn rates and the pool size live in this file, so the
+# game can be retuned (or load tested) without touching the code
+RULES_FILE = os.path.join(RULES_DIR, "bug_collecting.json")
+RULES = load_rules(RULES_FILE, BUG_COLORS, WIDTH, HEIGHT)
+
+# The default rules' values, for code that only needs those
+BUG_TYPES = RULES.bug_types
+MAX_BUGS = RULES.max_bugs
+SPAWN_DELAY = RULES.spawn_delay
+BREAK_SCORE = RULES.break_score
+WIN_SCORE = RULES.win_score
+
+# Every fixed color in the game, desaturated ahead of time
+PALETTE = Palette(list(BUG_COLORS.values()) + [BLACK, BROWN, (50, 50, 50)])
+
+def desaturate_color(color, intensity):
+    """Reduce color intensity, moving towards gray"""
+    # intensity ranges from 0 (full color) to 1 (gray); known colors are a
+    # table lookup, others fall back to the float formula
+    return PALETTE.desaturate(color, intensity)
+
+class Bug(BugView):
+    # Movement lives in BugSwarm.update(); this is a view over one bug's row
+    __slots__ = ()
+
+    @property
+    def color(self):
+        return desaturate_color(self.kind.color, self.color_intensity)
+
+    def draw(self, surface):
+        draw_bug(surface, self.type, self.x, self.y, self.size, self.color_intensity)
+
+    def is_clicked(self, pos):
+        distance = math.sqrt((pos[0] - self.x)**2 + (pos[1] - self.y)**2)
+        return distance <= self.size
+
+def draw_ant(surface, x, y, size, color, color_intensity):
+    # Draw ant (three circles for body)
+    pygame.draw.circle(surface, color, (int(x - 8), int(y)), 4)
+    pygame.draw.circle(surface, color, (int(x), int(y)), 5)
+    pygame.draw.circle(surface, color, (int(x + 8), int(y)), 4)
+    # Antennae
+    pygame.draw.line(surface, color, (int(x - 8), int(y)),
+                   (int(x - 12), int(y - 6)), 2)
+    pygame.draw.line(surface, color, (int(x - 8), int(y)),
+                   (int(x - 12), int(y + 6)), 2)
+
+def draw_beetle(surface, x, y, size, color, color_intensity):
+    # Draw beetle (oval body)
+    pygame.draw.ellipse(surface, color,
+                      (x - size, y - size//1.5,
+                       size * 2, size * 1.3))
+    # Head
+    pygame.draw.circle(surface, color, (int(x - size), int(y)), 8)
+    # Shell line
+    shell_color = desaturate_color((50, 50, 50), color_intensity)
+    pygame.draw.line(surface, shell_color, (int(x), int(y - size//1.5)),
+                   (int(x), int(y + size//1.5)), 2)
+
+def draw_ladybug(surface, x, y, size, color, color_intensity):
+    # Draw ladybug (red circle with spots)
+    pygame.draw.circle(surface, color, (int(x), int(y)), size)
+    # Head (black)
+    head_color = desaturate_color(BLACK, color_intensity)
+    pygame.draw.circle(surface, head_color, (int(x - size//1.3), int(y)), 9)
+    # Black spots
+    pygame.draw.circle(surface, head_color, (int(x - 6), int(y - 6)), 5)
+    pygame.draw.circle(surface, head_color, (int(x + 6), int(y - 6)), 5)
+    pygame.draw.circle(surface, head_color, (int(x - 6), int(y + 6)), 5)
+    pygame.draw.circle(surface, head_color, (int(x + 6), int(y + 6)), 5)
+    pygame.draw.circle(surface, head_color, (int(x), int(y)), 4)
+
+# How to draw each kind of bug
+BUG_SHAPES = {
+    "ant": draw_ant,
+    "beetle": draw_beetle,
+    "ladybug": draw_ladybug,
+}
+
+def draw_bug(surface, bug_type, x, y, size, color_intensity=0):
+    color = desaturate_color(BUG_COLORS[bug_type], color_intensity)
+    BUG_SHAPES[bug_type](surface, x, y, size, color, color_intensity)
+
+def draw_background(surface, color_intensity=0, rng=random):
+    # Create dirt and rocks background with desaturated colors
+    brown = desaturate_color(BROWN, color_intensity)
+    surface.fill(brown)
+
+    # Add texture with darker brown patches
+    for _ in range(100):
+        x = rng.randint(0, WIDTH)
+        y = rng.randint(0, HEIGHT)
+        size = rng.randint(20, 60)
+        darkness = rng.randint(0, 30)
+        color = (brown[0] - darkness, brown[1] - darkness, brown[2] - darkness)
+        pygame.draw.circle(surface, color, (x, y), size)
+
+    # Add rocks
+    for _ in range(30):
+        x = rng.randint(0, WIDTH)
+        y = rng.randint(0, HEIGHT)
+        size = rng.randint(10, 30)
+        # Gray rocks
+        gray = rng.randint(80, 140)
+        rock_color = desaturate_color((gray, gray, gray), color_intensity)
+        pygame.draw.circle(surface, rock_color, (x, y), size)
+        # Add highlight to rocks
+        highlight = desaturate_color((gray + 30, gray + 30, gray + 30), color_intensity)
+        pygame.draw.circle(surface, highlight, (x - size//3, y - size//3), size//3)
+
+def spawn_bug(bugs, color_intensity, rng=random, rules=RULES):
+    # Spawn rates come from the rules' weights (50% ants, 25% beetles,
+    # 25% ladybugs by default)
+    bug_type = pick_bug_type(rules, rng)
+    return spawn_at_random(bugs, bug_type, color_intensity, rng, rules)
+
+def spawn_at_random(bugs, bug_type, color_intensity, rng=random, rules=RULES):
+    margin = rules.spawn_margin
+    x = rng.randint(margin, bugs.width - margin)
+    y = rng.randint(margin, bugs.height - margin)
+    return bugs.spawn(bug_type, x, y, color_intensity, rng)
+
+class BugCollectingGame:
+    """The rules of the bug collecting game, with no display attached"""
+
+    def __init__(self, rng=random, max_bugs=None, rules=RULES):
+        self.rng = rng
+        # max_bugs, when given, overrides the rules' pool size
+        self.rules = rules if max_bugs is None else with_max_bugs(rules, max_bugs)
+        # A fixed pool; spawns and clicks reuse its rows instead of allocating
+        self.bugs = BugSwarm(self.rules.bug_types, WIDTH, HEIGHT, capacity=self.rules.max_bugs,
+                             view_class=Bug, grow=False)
+        self.running = True
+        self.restart()
+
+    def restart(self):
+        self.bugs.clear()
+        self.score = 0
+        self.spawn_timer = 0
+        self.paused = False
+        self.break_prompted = False
+        self.game_won = False
+        self.game_started = False
+        self.color_intensity = 0
+        # A new game gets new terrain; the seed comes from the game's rng so
+        # a seeded game always draws the same background
+        self.background_seed = self.rng.getrandbits(32)
+
+    @property
+    def playing(self):
+        return (self.game_started and not self.paused
+                and not self.break_prompted and not self.game_won)
+
+    def draw_alpha(self, alpha):
+        """How far between steps to draw the bugs; while nothing moves they are drawn where they are"""
+        return alpha if self.playing else 1.0
+
+    def start(self):
+        self.game_started = True
+        # Initialize bugs when game starts
+        rules = self.rules
+        for _ in range(rules.start_bugs):
+            spawn_bug(self.bugs, self.color_intensity, self.rng, rules)
+        for bug_type, count in rules.start_extra:
+            for _ in range(count):
+                spawn_at_random(self.bugs, bug_type, self.color_intensity, self.rng, rules)
+
+    def click(self, pos):
+        """Collect the topmost bug under pos; returns its type, or None"""
+        return self.clicks([pos])[0]
+
+    def clicks(self, positions):
+        """Collect the bugs under a batch of clicks; returns each one's bug type, or None
+
+        The same as calling click() for each position in turn, but the
+        swarm is searched once for the whole batch.
+        """
+        types = [None] * len(positions)
+        if not self.playing:
+            return types
+        for i, row in enumerate(self.bugs.collect_rows(positions)):
+            # A click can bring up the break prompt or win; the rest then miss
+            if not self.playing:
+                break
+            if row is not None:
+                types[i] = self.collect(row)
+        return types
+
+    def collect(self, row):
+        bug = self.bugs[row]
+        bug_type = bug.type
+        self.score += bug.points
+        self.bugs.remove(row)
+        rules = self.rules
+
+        # Update color intensity (max desaturation at the winning score)
+        if rules.win_score is not None:
+            self.color_intensity = min(self.score / rules.win_score, 1.0)
+
+        # Check for break prompt
+        if rules.break_score is not None and self.score == rules.break_score and not self.break_prompted:
+            self.break_prompted = True
+
+        # Check for win
+        if rules.win_score is not None and self.score >= rules.win_score:
+            self.game_won = True
+        return bug_type
+
+    def press(self, key):
+        """Handle a key by name: "space", "y", "n", "r" or "q" """
+        # Pause/Resume with SPACE
+        if key == "space" and not self.break_prompted and not self.game_won and self.game_started:
+            self.paused = not self.paused
+
+        # Break prompt response
+        if self.break_prompted:
+            if key == "y":
+                self.paused = True
+                self.break_prompted = False
+            elif key == "n":
+                self.break_prompted = False
+
+        # Win screen controls
+        if self.game_won:
+            if key == "r":
+                self.restart()
+            elif key == "q":
+                self.running = False
+
+    def handle(self, action):
+        """Apply one input tuple: ("start",), ("click", (x, y)) or ("key", name)
+
+        Returns the type of a clicked bug, or None.
+        """
+        if action[0] == "start":
+            if not self.game_started:
+                self.start()
+        elif action[0] == "click":
+            return self.click(action[1])
+        elif action[0] == "key":
+            self.press(action[1])
+        return None
+
+    def handle_all(self, actions):
+        """Apply a frame's inputs in order, each run of clicks as one batch
+
+        Returns what handle() would for each action.
+        """
+        results = []
+        for is_click, run in groupby(actions, key=lambda action: action[0] == "click"):
+            if is_click:
+                results.extend(self.clicks([action[1] for action in run]))
+            else:
+                results.extend(self.handle(action) for action in run)
+        return results
+
+    def step(self):
+        """Advance one frame; nothing moves unless the game is being played"""
+        self.move_bugs()
+        self.spawn_bugs()
+
+    def move_bugs(self):
+        if self.playing:
+            self.bugs.update()
+
+    def spawn_bugs(self):
+        # Spawn new bugs with current color intensity
+        if not self.playing:
+            return
+        rules = self.rules
+        self.spawn_timer += 1
+        if self.spawn_timer >= rules.spawn_delay and not self.bugs.full:
+            # A full pool holds the timer, so a bug appears as soon as one is caught
+            for _ in range(rules.spawn_count):
+                if self.bugs.full:
+                    break
+                spawn_bug(self.bugs, self.color_intensity, self.rng, rules)
+            self.spawn_timer = 0
@@ -0,0 +1,71 @@
+import numpy as np
+import pygame
+
+# Room around a bug's size for heads and antennae that stick out
+SPRITE_PADDING = 10
+# Bug art is drawn without antialiasing, so a color key gives the same pixels
+# as per-pixel alpha and RLE-encoded keyed blits are much cheaper
+COLORKEY = (255, 0, 255)
+
+
+class SpriteAtlas:
+    """Each (bug type, fade level) drawn once to a Surface, then blitted"""
+
+    def __init__(self, draw_bug, levels=1, disk_cache=None, art=()):
+        # draw_bug(surface, bug_type, x, y, size, color_intensity) draws one bug
+        self.draw_bug = draw_bug
+        self.levels = levels
+        # An optional SurfaceCache; art names the game and its art version
+        self.disk_cache = disk_cache
+        self.art = art
+        self.sprites = {}
+
+    def sprite(self, bug_type, size, level):
+        key = (bug_type, level)
+        if key not in self.sprites:
+            if self.disk_cache is None:
+                sprite, offset_x, offset_y = self.draw_sprite(bug_type, size, level)
+            else:
+                sprite, offset_x, offset_y = self.disk_cache.get(
+                    ("sprite",) + tuple(self.art) + (bug_type, int(size), level, self.levels),
+                    lambda: self.draw_sprite(bug_type, size, level))
+            if pygame.display.get_surface() is not None:
+                sprite = sprite.convert()
+            sprite.set_colorkey(COLORKEY, pygame.RLEACCEL)
+            self.sprites[key] = (sprite, offset_x, offset_y)
+        return self.sprites[key]
+
+    def draw_sprite(self, bug_type, size, level):
+        half = int(size) + SPRITE_PADDING
+        canvas = pygame.Surface((half * 2, half * 2))
+        canvas.fill(COLORKEY)
+        canvas.set_colorkey(COLORKEY)
+        intensity = level / (self.levels - 1) if self.levels > 1 else 0
+        self.draw_bug(canvas, bug_type, half, half, int(size), intensity)
+
+        # Trim to the pixels actually drawn
+        bounds = canvas.get_bounding_rect()
+        sprite = canvas.subsurface(bounds).copy()
+        # Offset from the bug's position to the sprite's top left corner
+        return sprite, bounds.x - half, bounds.y - half
+
+    def draw_swarm(self, surface, swarm, rects=False, alpha=1.0):
+        """Blit every live bug; with rects=True, return the areas drawn
+
+        alpha places each bug between its previous (0) and current (1) position.
+        """
+        n = swarm.count
+        if not n:
+            return []
+        rows = slice(0, n)
+        types = swarm.types[rows].tolist()
+        levels = np.rint(swarm.color_intensity[rows] * (self.levels - 1)).astype(int).tolist()
+        x, y = swarm.positions(alpha)
+        xs = x.astype(int).tolist()
+        ys = y.astype(int).tolist()
+
+        blits = []
+        for code, level, x, y in zip(types, levels, xs, ys):
+            sprite, offset_x, offset_y = self.sprite(swarm.type_names[code], swarm.type_sizes[code], level)
+            blits.append((sprite, (x + offset_x, y + offset_y)))
+        return surface.blits(blits, doreturn=rects) or []
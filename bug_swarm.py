@@ -0,0 +1,480 @@
+import math
+import random
+from collections import namedtuple
+
+import numpy as np
+
+from spatial_hash import SpatialHash
+
+# What every bug of one kind shares; a swarm stores only a type code per bug
+BugType = namedtuple("BugType", ["size", "points", "speed", "color"])
+
+# Hit step for a bug that never reaches a wall
+NEVER = np.iinfo(np.int32).max
+
+# Rows the click grid checks one by one, past which update() rebuilds it early
+GRID_EXTRA = 64
+
+# Bounces due on one axis in one step are done as a NumPy batch from this
+# many up; below it NumPy's per-call cost makes one at a time quicker
+BATCH_BOUNCES = 8
+
+
+class BugView:
+    """A thin object view over one row of a BugSwarm"""
+
+    __slots__ = ("swarm", "index")
+
+    def __init__(self, swarm, index):
+        self.swarm = swarm
+        self.index = index
+
+    # Views are only valid until the next remove(), which moves the last row
+    # into the freed one
+
+    @property
+    def type(self):
+        return self.swarm.type_names[self.swarm.types[self.index]]
+
+    @property
+    def kind(self):
+        """The shared BugType record for this bug"""
+        return self.swarm.type_records[self.swarm.types[self.index]]
+
+    @property
+    def x(self):
+        return self.swarm.position(self.index)[0]
+
+    @x.setter
+    def x(self, value):
+        self.swarm.set_motion(self.index, 0, position=value)
+
+    @property
+    def y(self):
+        return self.swarm.position(self.index)[1]
+
+    @y.setter
+    def y(self, value):
+        self.swarm.set_motion(self.index, 1, position=value)
+
+    @property
+    def speed_x(self):
+        return float(self.swarm.speed_x[self.index])
+
+    @speed_x.setter
+    def speed_x(self, value):
+        self.swarm.set_motion(self.index, 0, speed=value)
+
+    @property
+    def speed_y(self):
+        return float(self.swarm.speed_y[self.index])
+
+    @speed_y.setter
+    def speed_y(self, value):
+        self.swarm.set_motion(self.index, 1, speed=value)
+
+    @property
+    def size(self):
+        return self.kind.size
+
+    @property
+    def points(self):
+        return self.kind.points
+
+    @property
+    def color(self):
+        return self.kind.color
+
+    @property
+    def color_intensity(self):
+        return float(self.swarm.color_intensity[self.index])
+
+
+class BugSwarm:
+    """Every bug's state kept in NumPy arrays, moved by wall-hit events
+
+    A bug moves in a straight line until it hits a wall, so it is stored as
+    where it was at some step (its anchor) plus its speed. Its position at
+    any later step is worked out on demand. Each bug's next wall hit on each
+    axis waits in a queue bucketed by step, and update() only touches bugs
+    with a hit due, so a step costs nothing for bugs that are just flying
+    straight, and a step's hits all come out of the queue at once.
+
+    The click grid is rebuilt by update() too, every few steps: as often as
+    the fastest bug takes to cross a cell, so a click never needs to look
+    more than a cell further out than where the grid filed things.
+    """
+
+    def __init__(self, bug_types, width, height, capacity=64, view_class=BugView, grow=True):
+        # bug_types maps a type name to its BugType record
+        self.type_names = list(bug_types)
+        self.type_records = [bug_types[name] for name in self.type_names]
+        self.type_codes = {name: code for code, name in enumerate(self.type_names)}
+        self.type_sizes = [record.size for record in self.type_records]
+        self.type_speeds = [record.speed for record in self.type_records]
+        self.width = width
+        self.height = height
+        self.view_class = view_class
+        # With grow=False the swarm is a fixed pool and spawn() refuses when full
+        self.grow = grow
+        # Rows 0..count-1 are live and the rest are free, so the free list is
+        # just count: spawning takes the first free row, removing swaps the
+        # last live row into the hole
+        self.count = 0
+        # Steps run so far
+        self.time = 0
+        # step: (x rows, y rows) of upcoming wall hits. Entries are never
+        # deleted; one is stale once its row's hit column no longer says
+        # that step
+        self.events = {}
+        self._allocate(capacity)
+        # A bug can only be clicked within its own size, so one cell that
+        # wide means a click only has to look at the 3x3 cells around it,
+        # and a ring further out once bugs have moved since the last rebuild
+        self.grid = SpatialHash(width, height, max(self.type_sizes))
+        # Step at which update() next rebuilds the grid
+        self.grid_due = 0
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        # Where each bug was at the step its anchor was set
+        self.anchor_x = np.zeros(capacity)
+        self.anchor_y = np.zeros(capacity)
+        self.anchor_step_x = np.zeros(capacity, dtype=np.int32)
+        self.anchor_step_y = np.zeros(capacity, dtype=np.int32)
+        self.speed_x = np.zeros(capacity)
+        self.speed_y = np.zeros(capacity)
+        # Where a bug was the step before its anchor, for drawing between
+        # steps right after a bounce or a spawn
+        self.prev_x = np.zeros(capacity)
+        self.prev_y = np.zeros(capacity)
+        # Step of each bug's next wall hit, NEVER if it is not moving
+        self.hit_x = np.zeros(capacity, dtype=np.int32)
+        self.hit_y = np.zeros(capacity, dtype=np.int32)
+        self.types = np.zeros(capacity, dtype=np.int8)
+        self.color_intensity = np.zeros(capacity, dtype=np.float32)
+        # Each row's size, copied from its type when spawned; derived data,
+        # so not one of the columns
+        self._size = np.zeros(capacity)
+
+    def _columns(self):
+        return (self.anchor_x, self.anchor_y, self.anchor_step_x, self.anchor_step_y,
+                self.speed_x, self.speed_y, self.prev_x, self.prev_y, self.hit_x, self.hit_y,
+                self.types, self.color_intensity)
+
+    def _axis(self, axis):
+        """The arrays and play field length for axis 0 (x) or 1 (y)"""
+        if axis == 0:
+            return self.anchor_x, self.anchor_step_x, self.speed_x, self.prev_x, self.hit_x, self.width
+        return self.anchor_y, self.anchor_step_y, self.speed_y, self.prev_y, self.hit_y, self.height
+
+    def bytes_per_bug(self):
+        return sum(column.itemsize for column in self._columns())
+
+    def _grow(self):
+        old = self._columns()
+        old_size = self._size
+        self._allocate(self.capacity * 2)
+        for new_column, old_column in zip(self._columns() + (self._size,), old + (old_size,)):
+            new_column[:self.count] = old_column[:self.count]
+
+    @property
+    def full(self):
+        return self.count == self.capacity
+
+    def spawn(self, bug_type, x, y, color_intensity=0, rng=random):
+        """Fill the next free row and return a view of it; None if the pool is full"""
+        if self.full:
+            if not self.grow:
+                return None
+            self._grow()
+
+        # Same random calls, in the same order, as the old Bug.__init__
+        speed_x = rng.uniform(-2, 2)
+        speed_y = rng.uniform(-2, 2)
+
+        code = self.type_codes[bug_type]
+        i = self.count
+        self.count += 1
+        self.types[i] = code
+        self._size[i] = self.type_sizes[code]
+        self.color_intensity[i] = color_intensity
+        self.speed_x[i] = speed_x * self.type_speeds[code]
+        self.speed_y[i] = speed_y * self.type_speeds[code]
+        self._anchor(i, 0, x)
+        self._anchor(i, 1, y)
+        self.grid.insert(i)
+        return self.view_class(self, i)
+
+    def _anchor(self, row, axis, position):
+        """Restart a bug's straight line on one axis from position, now"""
+        anchor, anchor_step, _, prev, _, _ = self._axis(axis)
+        anchor[row] = prev[row] = position
+        anchor_step[row] = self.time
+        self._schedule(row, axis)
+
+    def _schedule(self, row, axis):
+        """Work out and queue a bug's next wall hit on one axis"""
+        anchor, anchor_step, speed, _, hit, length = self._axis(axis)
+        velocity = float(speed[row])
+        if velocity == 0:
+            hit[row] = NEVER
+            return
+        start = float(anchor[row])
+        size = float(self._size[row])
+        direction = 1 if velocity > 0 else -1
+        wall = length - size if velocity > 0 else size
+        # The first step that ends past the wall. The division can round
+        # either way by a step, so settle it with the same sum positions()
+        # uses
+        steps = max(math.floor((wall - start) / velocity) + 1, 1)
+        while steps > 1 and (start + velocity * (steps - 1) - wall) * direction > 0:
+            steps -= 1
+        while (start + velocity * steps - wall) * direction <= 0:
+            steps += 1
+        step = int(anchor_step[row]) + steps
+        if step >= NEVER:
+            hit[row] = NEVER
+            return
+        hit[row] = step
+        self._queue(step, row, axis)
+
+    def _queue(self, step, row, axis):
+        due = self.events.get(step)
+        if due is None:
+            due = self.events[step] = ([], [])
+        due[axis].append(row)
+
+    def _schedule_rows(self, rows, axis):
+        """_schedule() for an array of rows at once, with the same results"""
+        anchor, anchor_step, speed, _, hit, length = self._axis(axis)
+        velocity = speed[rows]
+        start = anchor[rows]
+        size = self._size[rows]
+        direction = np.sign(velocity)
+        wall = np.where(velocity > 0, length - size, size)
+        # A bug standing still, or too slow to get there before NEVER, is left out
+        steps = np.divide(wall - start, velocity, out=np.full(len(rows), float(NEVER)), where=velocity != 0)
+        steps = np.maximum(np.floor(steps) + 1, 1)
+        moving = steps < NEVER
+        back = moving & (steps > 1) & ((start + velocity * (steps - 1) - wall) * direction > 0)
+        while back.any():
+            steps[back] -= 1
+            back &= (steps > 1) & ((start + velocity * (steps - 1) - wall) * direction > 0)
+        ahead = moving & ((start + velocity * steps - wall) * direction <= 0)
+        while ahead.any():
+            steps[ahead] += 1
+            ahead &= (start + velocity * steps - wall) * direction <= 0
+        hits = np.minimum(np.where(moving, anchor_step[rows] + steps, NEVER), NEVER).astype(np.int32)
+        hit[rows] = hits
+        due = hits != NEVER
+        for step, row in zip(hits[due].tolist(), rows[due].tolist()):
+            self._queue(step, row, axis)
+
+    def set_motion(self, index, axis, position=None, speed=None):
+        """Move a bug or change its speed on one axis, from this step on"""
+        if position is None:
+            position = self.position(index)[axis]
+        if speed is not None:
+            self._axis(axis)[2][index] = speed
+        self._anchor(index, axis, position)
+        # It may have jumped, or be faster than the grid allows for
+        self.grid.insert(index)
+
+    def remove(self, index):
+        """Free a row by moving the last live bug into it; other views may now be stale"""
+        last = self.count - 1
+        if not 0 <= index <= last:
+            raise IndexError("bug index out of range")
+        if index != last:
+            for column in self._columns():
+                column[index] = column[last]
+            self._size[index] = self._size[last]
+            # Its queued hits still name the old row
+            for axis, hit in enumerate((self.hit_x, self.hit_y)):
+                if hit[index] != NEVER:
+                    self._queue(int(hit[index]), index, axis)
+        self.count = last
+        self.grid.remove(index, last)
+
+    def clear(self):
+        self.count = 0
+        self.events = {}
+        self._rebuild_grid()
+
+    def save_rows(self):
+        """Every live row's columns as bytes, for restore_rows()"""
+        return b"".join(column[:self.count].tobytes() for column in self._columns())
+
+    def restore_rows(self, count, time, data):
+        """Put back rows saved by save_rows() at step time; everything derived is rebuilt"""
+        while self.capacity < count:
+            if not self.grow:
+                raise ValueError(f"{count} bugs don't fit in a pool of {self.capacity}")
+            self._grow()
+        offset = 0
+        for column in self._columns():
+            column[:count] = np.frombuffer(data, column.dtype, count, offset)
+            offset += count * column.itemsize
+        self._size[:count] = np.take(self.type_sizes, self.types[:count])
+        self.count = count
+        self.time = time
+        # Only each row's current hits matter; stale entries never fire
+        self.events = {}
+        for axis, hit in enumerate((self.hit_x, self.hit_y)):
+            rows = np.flatnonzero(hit[:count] != NEVER)
+            for step, row in zip(hit[rows].tolist(), rows.tolist()):
+                self._queue(step, row, axis)
+        self._rebuild_grid()
+
+    def _along(self, axis, rows, alpha=1.0):
+        """Positions on one axis for rows, alpha of the way through the last step"""
+        anchor, anchor_step, speed, prev, _, _ = self._axis(axis)
+        elapsed = self.time - anchor_step[rows]
+        velocity = speed[rows]
+        now = anchor[rows] + velocity * elapsed
+        if alpha >= 1.0:
+            return now
+        # A bug anchored this step was somewhere else a step ago
+        before = np.where(elapsed == 0, prev[rows], now - velocity)
+        return before + (now - before) * alpha
+
+    def positions(self, alpha=1.0):
+        """x and y arrays for every live bug, alpha of the way through the last step"""
+        rows = slice(0, self.count)
+        return self._along(0, rows, alpha), self._along(1, rows, alpha)
+
+    def position(self, index):
+        x = self._along(0, slice(index, index + 1))
+        y = self._along(1, slice(index, index + 1))
+        return float(x[0]), float(y[0])
+
+    def bug_at(self, pos):
+        """The topmost bug under a point, or None"""
+        px, py = pos
+        candidates = self.grid.near(px, py, self.time)
+        if not len(candidates):
+            return None
+        dx = self._along(0, candidates) - px
+        dy = self._along(1, candidates) - py
+        size = self._size[candidates]
+        hits = candidates[dx * dx + dy * dy <= size * size]
+        if not len(hits):
+            return None
+        # Later rows are drawn on top
+        return self.view_class(self, int(hits.max()))
+
+    def collect_rows(self, positions):
+        """The row to remove for each of a batch of clicks, or None for a miss
+
+        Gives the same answers as calling bug_at() then remove() for each
+        click in turn, so the caller removes the rows in order. Nothing is
+        removed while the batch is worked out, though: the rows each
+        click lands on are found up front, and the swaps remove() will
+        make are followed in a small table instead.
+        """
+        hits_per_click = []
+        for px, py in positions:
+            candidates = self.grid.near(px, py, self.time)
+            if len(candidates):
+                dx = self._along(0, candidates) - px
+                dy = self._along(1, candidates) - py
+                size = self._size[candidates]
+                candidates = candidates[dx * dx + dy * dy <= size * size]
+            hits_per_click.append(candidates.tolist())
+
+        # Bugs are named by the row they had when the batch started
+        row_of = {}
+        bug_in = {}
+        removed = set()
+        count = self.count
+        rows = []
+        for hits in hits_per_click:
+            top, top_bug = -1, None
+            for bug in hits:
+                if bug not in removed and row_of.get(bug, bug) > top:
+                    top, top_bug = row_of.get(bug, bug), bug
+            if top_bug is None:
+                rows.append(None)
+                continue
+            rows.append(top)
+            # remove(top) moves the last bug into the freed row
+            removed.add(top_bug)
+            count -= 1
+            last_bug = bug_in.get(count, count)
+            if last_bug != top_bug:
+                row_of[last_bug] = top
+                bug_in[top] = last_bug
+        return rows
+
+    def update(self):
+        """Move every bug one step; only bugs hitting a wall are touched"""
+        self.time += 1
+        due = self.events.pop(self.time, None)
+        if due is not None:
+            for axis, rows in enumerate(due):
+                if len(rows) >= BATCH_BOUNCES:
+                    self._bounce_rows(np.array(rows), axis)
+                    continue
+                hit = self._axis(axis)[4]
+                for row in rows:
+                    # Skip stale entries: the row was freed, or its bug was
+                    # moved or rescheduled since
+                    if row < self.count and hit[row] == self.time:
+                        self._bounce(row, axis)
+        if self.time >= self.grid_due or len(self.grid.extra) > GRID_EXTRA:
+            self._rebuild_grid()
+
+    def _rebuild_grid(self):
+        """File every bug where it is now, and work out when to do it again"""
+        count = self.count
+        # A bounce only turns a bug round, so none goes further than this
+        # along an axis in a step until set_motion() says otherwise
+        speed = float(max(np.abs(self.speed_x[:count]).max(initial=0),
+                          np.abs(self.speed_y[:count]).max(initial=0)))
+        self.grid.rebuild(*self.positions(), self.time, speed)
+        steps = self.grid.cell_size // speed if speed else NEVER
+        self.grid_due = self.time + max(int(steps), 1)
+
+    def _bounce(self, row, axis):
+        anchor, anchor_step, speed, prev, _, length = self._axis(axis)
+        velocity = float(speed[row])
+        prev[row] = anchor[row] + velocity * (self.time - 1 - int(anchor_step[row]))
+        # Stop at the wall and turn around, as the old per-step clamp did
+        size = self._size[row]
+        anchor[row] = length - size if velocity > 0 else size
+        anchor_step[row] = self.time
+        speed[row] = -velocity
+        self._schedule(row, axis)
+
+    def _bounce_rows(self, rows, axis):
+        """_bounce() for an array of rows at once, stale ones included"""
+        anchor, anchor_step, speed, prev, hit, length = self._axis(axis)
+        rows = rows[rows < self.count]
+        # remove() can queue a row's hit twice
+        rows = np.unique(rows[hit[rows] == self.time])
+        velocity = speed[rows]
+        prev[rows] = anchor[rows] + velocity * (self.time - 1 - anchor_step[rows])
+        size = self._size[rows]
+        anchor[rows] = np.where(velocity > 0, length - size, size)
+        anchor_step[rows] = self.time
+        speed[rows] = -velocity
+        self._schedule_rows(rows, axis)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("bug index out of range")
+        return self.view_class(self, index)
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self.view_class(self, i)
+
+    def __reversed__(self):
+        for i in range(self.count - 1, -1, -1):
+            yield self.view_class(self, i)
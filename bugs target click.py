@@ -1,207 +1,334 @@
+import argparse
+import os
 import pygame
 import random
 import math
 
-# Initialize Pygame
-pygame.init()
+from backgrounds import BACKGROUND_VARIANTS
+from bug_sprites import SpriteAtlas
+from bug_swarm import BugSwarm, BugView
+from click_latency import ClickLatency
+from dirty_rects import DirtyRectRenderer
+from frame_profiler import FrameProfiler
+from game_rules import RULES_DIR, load_rules, pick_bug_type, with_max_bugs
+from startup import Preload, StartupReport
+from surface_cache import CACHE_DIR, SurfaceCache
+from text_cache import TextCache
+from timestep import FixedTimestep
 
 # Constants
 WIDTH, HEIGHT = 800, 600
 FPS = 60
+# The world moves in fixed steps at this rate whatever FPS is; bug speeds
+# and the spawn delay are per step
+STEP_RATE = 60
+MAX_SUBSTEPS = 5
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 BROWN = (101, 67, 33)
 DARK_BROWN = (76, 47, 21)
+# Names this game's art in the disk cache; bump it whenever the bug or
+# background drawing changes, so stale pictures are drawn again
+ART = ("bug target click", 1)
 
-# Create display
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Bug Clicker Game")
-clock = pygame.time.Clock()
-
-# Font
-font = pygame.font.Font(None, 48)
-small_font = pygame.font.Font(None, 32)
-
-class Bug:
-    def __init__(self, bug_type, x, y):
-        self.type = bug_type
-        self.x = x
-        self.y = y
-        self.speed_x = random.uniform(-2, 2)
-        self.speed_y = random.uniform(-2, 2)
-        
-        if bug_type == "ant":
-            self.size = 15
-            self.points = 1
-            self.color = (139, 69, 19)
-        elif bug_type == "beetle":
-            self.size = 25
-            self.points = 2
-            self.color = (0, 0, 0)
-        else:  # ladybug
-            self.size = 20
-            self.points = 3
-            self.color = (220, 20, 60)
-            # Ladybugs move faster, making them harder to click
-            self.speed_x *= 2
-            self.speed_y *= 2
-    
-    def update(self):
-        self.x += self.speed_x
-        self.y += self.speed_y
-        
-        # Bounce off walls
-        if self.x - self.size < 0 or self.x + self.size > WIDTH:
-            self.speed_x *= -1
-        if self.y - self.size < 0 or self.y + self.size > HEIGHT:
-            self.speed_y *= -1
-        
-        # Keep within bounds
-        self.x = max(self.size, min(WIDTH - self.size, self.x))
-        self.y = max(self.size, min(HEIGHT - self.size, self.y))
+# The window, clock and fonts are made by init_display(), so importing this
+# file never opens a window
+screen = None
+clock = None
+font = None
+small_font = None
+
+# Rendered text and panels are reused from here
+ui_cache = TextCache()
+
+# Bug art colors; everything else about each bug is in the rules file
+BUG_COLORS = {
+    "ant": (139, 69, 19),
+    "beetle": (0, 0, 0),
+    "ladybug": (220, 20, 60),
+}
+
+# Sizes, scores, spawn rates and the pool size; this game's ants are
+# smaller than the collecting game's
+RULES_FILE = os.path.join(RULES_DIR, "bug_target_click.json")
+RULES = load_rules(RULES_FILE, BUG_COLORS, WIDTH, HEIGHT)
+
+# The default rules' values, for code that only needs those
+BUG_TYPES = RULES.bug_types
+MAX_BUGS = RULES.max_bugs
+
+class Bug(BugView):
+    # Movement lives in BugSwarm.update(); this is a view over one bug's row
+    __slots__ = ()
     
     def draw(self, surface):
-        if self.type == "ant":
-            # Draw ant (three circles for body)
-            pygame.draw.circle(surface, self.color, (int(self.x - 8), int(self.y)), 4)
-            pygame.draw.circle(surface, self.color, (int(self.x), int(self.y)), 5)
-            pygame.draw.circle(surface, self.color, (int(self.x + 8), int(self.y)), 4)
-            # Antennae
-            pygame.draw.line(surface, self.color, (int(self.x - 8), int(self.y)), 
-                           (int(self.x - 12), int(self.y - 6)), 2)
-            pygame.draw.line(surface, self.color, (int(self.x - 8), int(self.y)), 
-                           (int(self.x - 12), int(self.y + 6)), 2)
-        
-        elif self.type == "beetle":
-            # Draw beetle (oval body)
-            pygame.draw.ellipse(surface, self.color, 
-                              (self.x - self.size, self.y - self.size//1.5, 
-                               self.size * 2, self.size * 1.3))
-            # Head
-            pygame.draw.circle(surface, self.color, (int(self.x - self.size), int(self.y)), 8)
-            # Shell line
-            pygame.draw.line(surface, (50, 50, 50), (int(self.x), int(self.y - self.size//1.5)), 
-                           (int(self.x), int(self.y + self.size//1.5)), 2)
-        
-        else:  # ladybug
-            # Draw ladybug (red circle with spots)
-            pygame.draw.circle(surface, self.color, (int(self.x), int(self.y)), self.size)
-            # Head (black) - made bigger
-            pygame.draw.circle(surface, BLACK, (int(self.x - self.size//1.3), int(self.y)), 9)
-            # Black spots - made bigger
-            pygame.draw.circle(surface, BLACK, (int(self.x - 6), int(self.y - 6)), 5)
-            pygame.draw.circle(surface, BLACK, (int(self.x + 6), int(self.y - 6)), 5)
-            pygame.draw.circle(surface, BLACK, (int(self.x - 6), int(self.y + 6)), 5)
-            pygame.draw.circle(surface, BLACK, (int(self.x + 6), int(self.y + 6)), 5)
-            pygame.draw.circle(surface, BLACK, (int(self.x), int(self.y)), 4)
+        draw_bug(surface, self.type, self.x, self.y, self.size)
     
     def is_clicked(self, pos):
         distance = math.sqrt((pos[0] - self.x)**2 + (pos[1] - self.y)**2)
         return distance <= self.size
 
-def draw_background(surface):
+def draw_ant(surface, x, y, size, color):
+    # Draw ant (three circles for body)
+    pygame.draw.circle(surface, color, (int(x - 8), int(y)), 4)
+    pygame.draw.circle(surface, color, (int(x), int(y)), 5)
+    pygame.draw.circle(surface, color, (int(x + 8), int(y)), 4)
+    # Antennae
+    pygame.draw.line(surface, color, (int(x - 8), int(y)),
+                   (int(x - 12), int(y - 6)), 2)
+    pygame.draw.line(surface, color, (int(x - 8), int(y)),
+                   (int(x - 12), int(y + 6)), 2)
+
+def draw_beetle(surface, x, y, size, color):
+    # Draw beetle (oval body)
+    pygame.draw.ellipse(surface, color,
+                      (x - size, y - size//1.5,
+                       size * 2, size * 1.3))
+    # Head
+    pygame.draw.circle(surface, color, (int(x - size), int(y)), 8)
+    # Shell line
+    pygame.draw.line(surface, (50, 50, 50), (int(x), int(y - size//1.5)),
+                   (int(x), int(y + size//1.5)), 2)
+
+def draw_ladybug(surface, x, y, size, color):
+    # Draw ladybug (red circle with spots)
+    pygame.draw.circle(surface, color, (int(x), int(y)), size)
+    # Head (black) - made bigger
+    pygame.draw.circle(surface, BLACK, (int(x - size//1.3), int(y)), 9)
+    # Black spots - made bigger
+    pygame.draw.circle(surface, BLACK, (int(x - 6), int(y - 6)), 5)
+    pygame.draw.circle(surface, BLACK, (int(x + 6), int(y - 6)), 5)
+    pygame.draw.circle(surface, BLACK, (int(x - 6), int(y + 6)), 5)
+    pygame.draw.circle(surface, BLACK, (int(x + 6), int(y + 6)), 5)
+    pygame.draw.circle(surface, BLACK, (int(x), int(y)), 4)
+
+# How to draw each kind of bug
+BUG_SHAPES = {
+    "ant": draw_ant,
+    "beetle": draw_beetle,
+    "ladybug": draw_ladybug,
+}
+
+def draw_bug(surface, bug_type, x, y, size, color_intensity=0):
+    # Colors never fade in this game, so color_intensity is unused
+    BUG_SHAPES[bug_type](surface, x, y, size, BUG_COLORS[bug_type])
+
+def draw_background(surface, rng=random):
     # Create dirt and rocks background
     surface.fill(BROWN)
     
     # Add texture with darker brown patches
     for _ in range(100):
-        x = random.randint(0, WIDTH)
-        y = random.randint(0, HEIGHT)
-        size = random.randint(20, 60)
-        darkness = random.randint(0, 30)
+        x = rng.randint(0, WIDTH)
+        y = rng.randint(0, HEIGHT)
+        size = rng.randint(20, 60)
+        darkness = rng.randint(0, 30)
         color = (BROWN[0] - darkness, BROWN[1] - darkness, BROWN[2] - darkness)
         pygame.draw.circle(surface, color, (x, y), size)
     
     # Add rocks
     for _ in range(30):
-        x = random.randint(0, WIDTH)
-        y = random.randint(0, HEIGHT)
-        size = random.randint(10, 30)
+        x = rng.randint(0, WIDTH)
+        y = rng.randint(0, HEIGHT)
+        size = rng.randint(10, 30)
         # Gray rocks
-        gray = random.randint(80, 140)
+        gray = rng.randint(80, 140)
         pygame.draw.circle(surface, (gray, gray, gray), (x, y), size)
         # Add highlight to rocks
         pygame.draw.circle(surface, (gray + 30, gray + 30, gray + 30), 
                          (x - size//3, y - size//3), size//3)
 
-def spawn_bug():
-    # Spawn rates: 50% ants, 25% beetles, 25% ladybugs (more ladybugs!)
-    rand = random.random()
-    if rand < 0.5:
-        bug_type = "ant"
-    elif rand < 0.75:
-        bug_type = "beetle"
-    else:
-        bug_type = "ladybug"
+def make_background(rng=random):
+    background = pygame.Surface((WIDTH, HEIGHT))
+    draw_background(background, rng)
+    return background
+
+def load_background(seed, disk_cache=None):
+    if disk_cache is None:
+        return make_background(random.Random(seed))
+    key = ("background",) + ART + (seed, (WIDTH, HEIGHT))
+    return disk_cache.surface(key, lambda: make_background(random.Random(seed)))
+
+def spawn_bug(bugs, rules):
+    # Spawn rates come from the rules' weights (50% ants, 25% beetles,
+    # 25% ladybugs by default)
+    return spawn_at_random(bugs, pick_bug_type(rules, random), rules)
+
+def spawn_at_random(bugs, bug_type, rules):
+    margin = rules.spawn_margin
+    x = random.randint(margin, WIDTH - margin)
+    y = random.randint(margin, HEIGHT - margin)
+    return bugs.spawn(bug_type, x, y)
+
+def build_score_panel(score):
+    score_text = ui_cache.text(font, f"Score: {score}", WHITE)
+    panel = ui_cache.overlay((score_text.get_width() + 20, score_text.get_height() + 10), BLACK, 180).copy()
+    panel.blit(score_text, (10, 5))
+    return panel
+
+def draw_score(surface, score):
+    panel = ui_cache.get(("score", score), lambda: build_score_panel(score))
+    return surface.blit(panel, (10, 10))
+
+def init_display():
+    global screen, clock, font, small_font
+    
+    # Initialize only what the game uses; there is no sound, so no mixer
+    pygame.display.init()
+    pygame.font.init()
+    
+    # Create display
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Bug Clicker Game")
+    clock = pygame.time.Clock()
     
-    x = random.randint(50, WIDTH - 50)
-    y = random.randint(50, HEIGHT - 50)
-    return Bug(bug_type, x, y)
+    # Font
+    font = pygame.font.Font(None, 48)
+    small_font = pygame.font.Font(None, 32)
 
-def main():
-    # Create static background
+def main(dirty_rects=False, fps=FPS, profile_out=None, max_bugs=None, startup_report=False,
+         cache_dir=CACHE_DIR, rules_file=RULES_FILE, latency_out=None):
+    report = StartupReport()
+    # Checked before the window opens, so a bad file is reported straight away
+    rules = load_rules(rules_file, BUG_COLORS, WIDTH, HEIGHT)
+    if max_bugs is not None:
+        rules = with_max_bugs(rules, max_bugs)
+    init_display()
+    report.mark("window")
+    # Sprites and backgrounds drawn on earlier runs are loaded from here
+    disk_cache = SurfaceCache(cache_dir) if cache_dir else None
+    
+    # Create (or load) static background on a thread; plain dirt stands in until it is done
+    preload = Preload(load_background, random.randrange(BACKGROUND_VARIANTS), disk_cache)
     background = pygame.Surface((WIDTH, HEIGHT))
-    draw_background(background)
+    background.fill(BROWN)
     
-    bugs = []
+    # A fixed pool; spawns and clicks reuse its rows instead of allocating
+    bugs = BugSwarm(rules.bug_types, WIDTH, HEIGHT, capacity=rules.max_bugs, view_class=Bug, grow=False)
+    sprites = SpriteAtlas(draw_bug, disk_cache=disk_cache, art=ART)
+    renderer = DirtyRectRenderer(screen, enabled=dirty_rects)
     score = 0
     spawn_timer = 0
-    spawn_delay = 60  # Spawn a new bug every 60 frames (1 second at 60 FPS)
     
     # Start with more bugs including more ladybugs
-    for _ in range(3):
-        bugs.append(spawn_bug())
+    for _ in range(rules.start_bugs):
+        spawn_bug(bugs, rules)
     # Add extra ladybugs at start
-    for _ in range(3):
-        x = random.randint(50, WIDTH - 50)
-        y = random.randint(50, HEIGHT - 50)
-        bugs.append(Bug("ladybug", x, y))
+    for bug_type, count in rules.start_extra:
+        for _ in range(count):
+            spawn_at_random(bugs, bug_type, rules)
+    
+    timestep = FixedTimestep(STEP_RATE, MAX_SUBSTEPS)
+    # Press F3 to show frame timings
+    profiler = FrameProfiler(dump_path=profile_out)
+    latency = ClickLatency(dump_path=latency_out)
     
+    # The first frame goes out as soon as it is drawn; the cap applies after
+    frame_cap = 0
     running = True
     while running:
-        clock.tick(FPS)
+        elapsed = clock.tick(frame_cap) / 1000
+        frame_cap = fps
+        profiler.begin_frame()
         
-        for event in pygame.event.get():
+        clicks = []
+        events = pygame.event.get()
+        latency.read()
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
             
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                profiler.toggle()
+            
             if event.type == pygame.MOUSEBUTTONDOWN:
-                mouse_pos = pygame.mouse.get_pos()
-                # Check clicks from last to first (top to bottom)
-                for bug in reversed(bugs):
-                    if bug.is_clicked(mouse_pos):
-                        score += bug.points
-                        bugs.remove(bug)
-                        break
+                # Where this click happened, not where the mouse is now
+                clicks.append(event.pos)
         
-        # Update bugs
-        for bug in bugs:
-            bug.update()
+        # The frame's clicks are looked up in the swarm's grid together
+        if clicks:
+            caught = 0
+            for row in bugs.collect_rows(clicks):
+                if row is not None:
+                    score += bugs[row].points
+                    bugs.remove(row)
+                    caught += 1
+            latency.scored(caught)
+        profiler.mark("event")
         
-        # Spawn new bugs
-        spawn_timer += 1
-        if spawn_timer >= spawn_delay and len(bugs) < 15:
-            bugs.append(spawn_bug())
-            spawn_timer = 0
+        for _ in range(timestep.advance(elapsed)):
+            # Update bugs
+            bugs.update()
+            profiler.mark("update")
+            
+            # Spawn new bugs
+            spawn_timer += 1
+            if spawn_timer >= rules.spawn_delay and not bugs.full:
+                for _ in range(rules.spawn_count):
+                    if bugs.full:
+                        break
+                    spawn_bug(bugs, rules)
+                spawn_timer = 0
+            profiler.mark("spawn")
+        
+        if preload and preload.ready:
+            background = preload.result()
+            report.mark("background ready", preload.finished_at)
+            preload = None
         
         # Draw everything
-        screen.blit(background, (0, 0))
+        renderer.begin(background)
+        profiler.mark("background")
         
-        for bug in bugs:
-            bug.draw(screen)
+        renderer.add(sprites.draw_swarm(screen, bugs, rects=dirty_rects, alpha=timestep.alpha))
         
         # Draw score
-        score_text = font.render(f"Score: {score}", True, WHITE)
-        score_bg = pygame.Surface((score_text.get_width() + 20, score_text.get_height() + 10))
-        score_bg.fill(BLACK)
-        score_bg.set_alpha(180)
-        screen.blit(score_bg, (10, 10))
-        screen.blit(score_text, (20, 15))
+        renderer.add([draw_score(screen, score)])
         
+        overlay_rect = profiler.draw(screen)
+        if overlay_rect:
+            renderer.add([overlay_rect])
+        profiler.mark("draw")
         
-        pygame.display.flip()
+        renderer.present()
+        report.mark("first frame")
+        latency.shown()
+        profiler.mark("flip")
+        profiler.end_frame()
     
+    if startup_report:
+        report.print()
+    if latency_out:
+        latency.print()
+    latency.close()
+    profiler.close()
     pygame.quit()
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Bug Clicker Game")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="only redraw the parts of the screen that changed each frame")
+    parser.add_argument("--fps", type=int, default=FPS,
+                        help="frame rate cap, 0 for uncapped; game speed stays the same")
+    parser.add_argument("--profile-out", default=None,
+                        help="write per-frame phase timings here at exit (.csv or .jsonl)")
+    parser.add_argument("--max-bugs", type=int, default=None,
+                        help="size of the bug pool, the most bugs on screen at once; overrides the rules")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="print how long the window, first frame and background took, at exit")
+    parser.add_argument("--cache-dir", default=CACHE_DIR,
+                        help="keep drawn sprites and backgrounds here between runs")
+    parser.add_argument("--no-disk-cache", action="store_true",
+                        help="draw everything from scratch and don't save it")
+    parser.add_argument("--rules", default=RULES_FILE,
+                        help="rules file with bug sizes, spawn rates and the pool size")
+    parser.add_argument("--latency-out", default=None,
+                        help="write each scoring click's latency here (.csv or .jsonl) and print a summary at exit")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    main(dirty_rects=args.dirty_rects, fps=args.fps, profile_out=args.profile_out,
+         max_bugs=args.max_bugs, startup_report=args.startup_report,
+         cache_dir=None if args.no_disk_cache else args.cache_dir, rules_file=args.rules,
+         latency_out=args.latency_out)
\ No newline at end of file
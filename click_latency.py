@@ -0,0 +1,81 @@
+import json
+import sys
+import time
+
+import numpy as np
+
+class ClickLatency:
+    """Milliseconds from a scoring click to the flip that shows its score
+
+    pygame events carry no timestamp, so when a click happened is only
+    known to lie between two reads of the queue. Each click gets both
+    ends: "ms" counts from the read that picked it up, which is the time
+    the game itself takes (handling, update, draw and flip), and
+    "worst_ms" from the read before, as if it had waited in the queue
+    for the whole frame in between. The real latency is somewhere from
+    the one to the other.
+    """
+
+    def __init__(self, window=600, dump_path=None):
+        # Ring buffer of the last `window` clicks: ms, worst_ms
+        self.samples = np.zeros((window, 2))
+        self.count = 0
+        self.frame = 0
+        self.read_at = None
+        self.last_read_at = None
+        # (frame, read time, time of the read before) of scored clicks not on screen yet
+        self.pending = []
+
+        self.dump = None
+        self.dump_csv = False
+        if dump_path:
+            self.dump = open(dump_path, "w", buffering=1 << 16)
+            self.dump_csv = dump_path.endswith(".csv")
+            if self.dump_csv:
+                self.dump.write("click,frame,ms,worst_ms\n")
+
+    def read(self):
+        """Call as soon as pygame.event.get() returns the frame's events"""
+        self.last_read_at = self.read_at
+        self.read_at = time.perf_counter()
+
+    def scored(self, clicks=1):
+        """Call when clicks from this frame's read have changed the score"""
+        # Before the first read, nothing says how long a click was queued
+        since = self.read_at if self.last_read_at is None else self.last_read_at
+        self.pending.extend([(self.frame, self.read_at, since)] * clicks)
+
+    def shown(self):
+        """Call right after the flip; everything scored so far is now on screen"""
+        now = time.perf_counter()
+        for frame, read_at, since in self.pending:
+            ms = (now - read_at) * 1000
+            worst_ms = (now - since) * 1000
+            self.samples[self.count % len(self.samples)] = (ms, worst_ms)
+            if self.dump:
+                if self.dump_csv:
+                    self.dump.write(f"{self.count},{frame},{ms:.4f},{worst_ms:.4f}\n")
+                else:
+                    self.dump.write(json.dumps({"click": self.count, "frame": frame, "ms": round(ms, 4),
+                                                "worst_ms": round(worst_ms, 4)}) + "\n")
+            self.count += 1
+        self.pending.clear()
+        self.frame += 1
+
+    def percentiles(self):
+        """{"ms": (p50, p95, p99), "worst_ms": (p50, p95, p99)} over the recent clicks"""
+        filled = self.samples[:min(self.count, len(self.samples))]
+        if not len(filled):
+            return {}
+        table = np.percentile(filled, [50, 95, 99], axis=0)
+        return {"ms": tuple(table[:, 0].tolist()), "worst_ms": tuple(table[:, 1].tolist())}
+
+    def print(self, file=sys.stderr):
+        print(f"click to score, {self.count} clicks", file=file)
+        for name, (p50, p95, p99) in self.percentiles().items():
+            print(f"  {name:<10}p50 {p50:7.2f}  p95 {p95:7.2f}  p99 {p99:7.2f}", file=file)
+
+    def close(self):
+        if self.dump:
+            self.dump.close()
+            self.dump = None
@@ -0,0 +1,193 @@
+import argparse
+import mmap
+import os
+import struct
+import time
+
+from story import Node, load_story
+
+# A compiled story is one file read in place through mmap:
+#
+#   header
+#   node table     one NODE record per node
+#   choice table   one CHOICE record per choice, each node's in a run
+#   id order       node numbers sorted by id, for looking nodes up by name
+#   string starts  string_count + 1 offsets into the string data
+#   string data    every distinct string once, UTF-8
+#
+# Opening one only reads the header, so it takes the same time whatever
+# the size of the story; pages are read in as nodes are visited.
+MAGIC = b"STRY"
+VERSION = 1
+# magic, version, node count, choice count, string count, start node, then
+# the string numbers of the title, greeting, intro and farewell
+HEADER = struct.Struct("<4sB3xIIIIIIII")
+# id string, text string, first choice, choice count, flags
+NODE = struct.Struct("<IIIHH")
+# label string, node it leads to
+CHOICE = struct.Struct("<II")
+UINT = struct.Struct("<I")
+
+ENDING = 1
+
+def compile_story(story, path):
+    """Write a loaded (and so already checked) story as a compiled file"""
+    strings = {}
+
+    def intern(text):
+        if text not in strings:
+            strings[text] = len(strings)
+        return strings[text]
+
+    header_strings = [intern(story.title), intern(story.greeting), intern(story.intro), intern(story.farewell)]
+    node_table = bytearray()
+    choice_table = bytearray()
+    choice_count = 0
+    for node in story.nodes:
+        node_table += NODE.pack(intern(node.id), intern(node.text), choice_count,
+                                len(node.choices), ENDING if node.ending else 0)
+        for label, target in node.choices:
+            choice_table += CHOICE.pack(intern(label), target)
+        choice_count += len(node.choices)
+
+    # Sorted by the encoded bytes, which is the order lookups compare in
+    encoded = [text.encode("utf-8") for text in strings]
+    id_order = sorted(range(len(story.nodes)), key=lambda i: encoded[strings[story.nodes[i].id]])
+
+    starts = [0]
+    for data in encoded:
+        starts.append(starts[-1] + len(data))
+
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(story.nodes), choice_count, len(strings),
+                               story.start, *header_strings))
+        file.write(node_table)
+        file.write(choice_table)
+        file.write(struct.pack(f"<{len(id_order)}I", *id_order))
+        file.write(struct.pack(f"<{len(starts)}I", *starts))
+        file.write(b"".join(encoded))
+
+class CompiledStory:
+    """A compiled story read in place; used just like a Story from story.py"""
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.data) < HEADER.size:
+            raise ValueError(f"{path} is not a compiled story")
+        (magic, version, self.node_count, choice_count, string_count, self.start,
+         title, greeting, intro, farewell) = HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} compiled story")
+
+        self.node_offset = HEADER.size
+        self.choice_offset = self.node_offset + self.node_count * NODE.size
+        self.id_order_offset = self.choice_offset + choice_count * CHOICE.size
+        self.string_offset = self.id_order_offset + self.node_count * UINT.size
+        self.text_offset = self.string_offset + (string_count + 1) * UINT.size
+        self.string_count = string_count
+        if len(self.data) < self.text_offset:
+            raise ValueError(f"{path} is cut short")
+
+        self.title = self.string(title)
+        self.greeting = self.string(greeting)
+        self.intro = self.string(intro)
+        self.farewell = self.string(farewell)
+        self.nodes = NodeTable(self)
+        self.index = IdIndex(self)
+
+    def string(self, number):
+        return self.string_bytes(number).decode("utf-8")
+
+    def string_bytes(self, number):
+        start, end = struct.unpack_from("<II", self.data, self.string_offset + number * UINT.size)
+        return self.data[self.text_offset + start:self.text_offset + end]
+
+    def node(self, i):
+        if not 0 <= i < self.node_count:
+            raise IndexError("node index out of range")
+        node_id, text, first, count, flags = NODE.unpack_from(self.data, self.node_offset + i * NODE.size)
+        choices = []
+        for offset in range(self.choice_offset + first * CHOICE.size,
+                            self.choice_offset + (first + count) * CHOICE.size, CHOICE.size):
+            label, target = CHOICE.unpack_from(self.data, offset)
+            choices.append((self.string(label), target))
+        return Node(self.string(node_id), self.string(text), tuple(choices), bool(flags & ENDING))
+
+    def find(self, node_id):
+        """Index of the node called node_id, or None; a binary search of the id order"""
+        key = node_id.encode("utf-8")
+        low, high = 0, self.node_count
+        while low < high:
+            middle = (low + high) // 2
+            i = UINT.unpack_from(self.data, self.id_order_offset + middle * UINT.size)[0]
+            id_string = NODE.unpack_from(self.data, self.node_offset + i * NODE.size)[0]
+            found = self.string_bytes(id_string)
+            if found == key:
+                return i
+            if found < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def close(self):
+        self.data.close()
+
+class NodeTable:
+    """story.nodes for a compiled story: each Node is read when asked for"""
+
+    def __init__(self, story):
+        self.story = story
+
+    def __len__(self):
+        return self.story.node_count
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.story.node_count
+        return self.story.node(i)
+
+class IdIndex:
+    """story.index for a compiled story: node id to node index"""
+
+    def __init__(self, story):
+        self.story = story
+
+    def __len__(self):
+        return self.story.node_count
+
+    def __getitem__(self, node_id):
+        i = self.story.find(node_id)
+        if i is None:
+            raise KeyError(node_id)
+        return i
+
+    def __contains__(self, node_id):
+        return self.story.find(node_id) is not None
+
+    def get(self, node_id, default=None):
+        i = self.story.find(node_id)
+        return default if i is None else i
+
+def open_story(path):
+    """A Story from a JSON story file, or a CompiledStory from a compiled one"""
+    with open(path, "rb") as file:
+        compiled = file.read(len(MAGIC)) == MAGIC
+    return CompiledStory(path) if compiled else load_story(path)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compile a JSON story for fast loading")
+    parser.add_argument("story", help="JSON story file")
+    parser.add_argument("-o", "--output", default=None,
+                        help="compiled file to write; defaults to the story's name with .story")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    output = args.output or os.path.splitext(args.story)[0] + ".story"
+    start = time.perf_counter()
+    story = load_story(args.story)
+    compile_story(story, output)
+    elapsed = time.perf_counter() - start
+    print(f"{len(story.nodes)} nodes -> {output} ({os.path.getsize(output):,} bytes) in {elapsed:.2f}s")
@@ -0,0 +1,46 @@
+import pygame
+
+
+class DirtyRectRenderer:
+    """Only repaints and pushes the parts of the screen that changed"""
+
+    def __init__(self, screen, enabled=True, max_rects=400):
+        self.screen = screen
+        self.enabled = enabled
+        # Past this many rects one flip is cheaper than a long update list
+        self.max_rects = max_rects
+        self.background = None
+        self.previous = []
+        self.current = []
+        self.stale = True
+        self.whole_screen = True
+
+    def begin(self, background):
+        """Paint the background back over everything drawn last frame"""
+        if not self.enabled or self.stale or background is not self.background:
+            self.screen.blit(background, (0, 0))
+            self.background = background
+            self.stale = False
+            self.whole_screen = True
+        else:
+            for rect in self.previous:
+                self.screen.blit(background, rect, rect)
+        self.current = []
+
+    def add(self, rects):
+        self.current.extend(rects)
+
+    def invalidate(self):
+        # Something covered the whole screen: push all of it now and repaint all of it next frame
+        self.stale = True
+        self.whole_screen = True
+
+    def present(self):
+        rects = self.previous + self.current
+        if not self.enabled or self.whole_screen or len(rects) > self.max_rects:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+        self.previous = self.current
+        self.current = []
+        self.whole_screen = False
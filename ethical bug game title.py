@@ -1,217 +1,129 @@
-import pygame
+import argparse
 import random
-import math
 
-# Initialize Pygame
-pygame.init()
+import pygame
+
+from backgrounds import BACKGROUND_VARIANTS, FadingBackground
+from bug_collecting import (ART, BUG_COLORS, RULES_FILE, BugCollectingGame, HEIGHT, WIDTH,
+                            draw_background, draw_bug)
+from bug_sprites import SpriteAtlas
+from click_latency import ClickLatency
+from dirty_rects import DirtyRectRenderer
+from frame_profiler import FrameProfiler
+from game_rules import load_rules, rules_digest, with_max_bugs
+from replay import InputRecorder, Replay
+from startup import Preload, StartupReport
+from surface_cache import CACHE_DIR, SurfaceCache
+from text_cache import TextCache
+from timestep import FixedTimestep
 
 # Constants
-WIDTH, HEIGHT = 800, 600
 FPS = 60
+# The world moves in fixed steps at this rate whatever FPS is; bug speeds
+# and the spawn delay are per step
+STEP_RATE = 60
+MAX_SUBSTEPS = 5
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
-BROWN = (101, 67, 33)
-DARK_BROWN = (76, 47, 21)
 
-# Create display
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Bug Clicker Game")
-clock = pygame.time.Clock()
+# Keys the game reacts to, by the names BugCollectingGame.press() uses
+KEY_NAMES = {
+    pygame.K_SPACE: "space",
+    pygame.K_y: "y",
+    pygame.K_n: "n",
+    pygame.K_r: "r",
+    pygame.K_q: "q",
+}
 
-# Font
-font = pygame.font.Font(None, 48)
-small_font = pygame.font.Font(None, 32)
-medium_font = pygame.font.Font(None, 36)
+# The window, clock and fonts are made by init_display(), so importing this
+# file (or bug_collecting on its own) never opens a window
+screen = None
+clock = None
+font = None
+small_font = None
+medium_font = None
+title_font = None
 
-def desaturate_color(color, intensity):
-    """Reduce color intensity, moving towards gray"""
-    # intensity ranges from 0 (full color) to 1 (gray)
-    r, g, b = color
-    gray = (r + g + b) / 3
-    new_r = int(r + (gray - r) * intensity)
-    new_g = int(g + (gray - g) * intensity)
-    new_b = int(b + (gray - b) * intensity)
-    return (new_r, new_g, new_b)
+# Text, overlays and whole screens are rendered once and reused from here
+ui_cache = TextCache()
 
-class Bug:
-    def __init__(self, bug_type, x, y, color_intensity=0):
-        self.type = bug_type
-        self.x = x
-        self.y = y
-        self.speed_x = random.uniform(-2, 2)
-        self.speed_y = random.uniform(-2, 2)
-        self.color_intensity = color_intensity
-        
-        if bug_type == "ant":
-            self.size = 44
-            self.points = 1
-            base_color = (139, 69, 19)
-            self.color = desaturate_color(base_color, color_intensity)
-        elif bug_type == "beetle":
-            self.size = 25
-            self.points = 2
-            base_color = (0, 0, 0)
-            self.color = desaturate_color(base_color, color_intensity)
-        else:  # ladybug
-            self.size = 20
-            self.points = 3
-            base_color = (220, 20, 60)
-            self.color = desaturate_color(base_color, color_intensity)
-            # Ladybugs move faster, making them harder to click
-            self.speed_x *= 2
-            self.speed_y *= 2
-    
-    def update(self):
-        self.x += self.speed_x
-        self.y += self.speed_y
-        
-        # Bounce off walls
-        if self.x - self.size < 0 or self.x + self.size > WIDTH:
-            self.speed_x *= -1
-        if self.y - self.size < 0 or self.y + self.size > HEIGHT:
-            self.speed_y *= -1
-        
-        # Keep within bounds
-        self.x = max(self.size, min(WIDTH - self.size, self.x))
-        self.y = max(self.size, min(HEIGHT - self.size, self.y))
+def init_display():
+    global screen, clock, font, small_font, medium_font, title_font
     
-    def draw(self, surface):
-        if self.type == "ant":
-            # Draw ant (three circles for body)
-            pygame.draw.circle(surface, self.color, (int(self.x - 8), int(self.y)), 4)
-            pygame.draw.circle(surface, self.color, (int(self.x), int(self.y)), 5)
-            pygame.draw.circle(surface, self.color, (int(self.x + 8), int(self.y)), 4)
-            # Antennae
-            pygame.draw.line(surface, self.color, (int(self.x - 8), int(self.y)), 
-                           (int(self.x - 12), int(self.y - 6)), 2)
-            pygame.draw.line(surface, self.color, (int(self.x - 8), int(self.y)), 
-                           (int(self.x - 12), int(self.y + 6)), 2)
-        
-        elif self.type == "beetle":
-            # Draw beetle (oval body)
-            pygame.draw.ellipse(surface, self.color, 
-                              (self.x - self.size, self.y - self.size//1.5, 
-                               self.size * 2, self.size * 1.3))
-            # Head
-            pygame.draw.circle(surface, self.color, (int(self.x - self.size), int(self.y)), 8)
-            # Shell line
-            shell_color = desaturate_color((50, 50, 50), self.color_intensity)
-            pygame.draw.line(surface, shell_color, (int(self.x), int(self.y - self.size//1.5)), 
-                           (int(self.x), int(self.y + self.size//1.5)), 2)
-        
-        else:  # ladybug
-            # Draw ladybug (red circle with spots)
-            pygame.draw.circle(surface, self.color, (int(self.x), int(self.y)), self.size)
-            # Head (black)
-            head_color = desaturate_color(BLACK, self.color_intensity)
-            pygame.draw.circle(surface, head_color, (int(self.x - self.size//1.3), int(self.y)), 9)
-            # Black spots
-            pygame.draw.circle(surface, head_color, (int(self.x - 6), int(self.y - 6)), 5)
-            pygame.draw.circle(surface, head_color, (int(self.x + 6), int(self.y - 6)), 5)
-            pygame.draw.circle(surface, head_color, (int(self.x - 6), int(self.y + 6)), 5)
-            pygame.draw.circle(surface, head_color, (int(self.x + 6), int(self.y + 6)), 5)
-            pygame.draw.circle(surface, head_color, (int(self.x), int(self.y)), 4)
+    # Initialize only what the game uses; there is no sound, so no mixer
+    pygame.display.init()
+    pygame.font.init()
     
-    def is_clicked(self, pos):
-        distance = math.sqrt((pos[0] - self.x)**2 + (pos[1] - self.y)**2)
-        return distance <= self.size
-
-def draw_background(surface, color_intensity=0):
-    # Create dirt and rocks background with desaturated colors
-    brown = desaturate_color(BROWN, color_intensity)
-    surface.fill(brown)
+    # Create display
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Bug Clicker Game")
+    clock = pygame.time.Clock()
     
-    # Add texture with darker brown patches
-    for _ in range(100):
-        x = random.randint(0, WIDTH)
-        y = random.randint(0, HEIGHT)
-        size = random.randint(20, 60)
-        darkness = random.randint(0, 30)
-        color = (brown[0] - darkness, brown[1] - darkness, brown[2] - darkness)
-        pygame.draw.circle(surface, color, (x, y), size)
-    
-    # Add rocks
-    for _ in range(30):
-        x = random.randint(0, WIDTH)
-        y = random.randint(0, HEIGHT)
-        size = random.randint(10, 30)
-        # Gray rocks
-        gray = random.randint(80, 140)
-        rock_color = desaturate_color((gray, gray, gray), color_intensity)
-        pygame.draw.circle(surface, rock_color, (x, y), size)
-        # Add highlight to rocks
-        highlight = desaturate_color((gray + 30, gray + 30, gray + 30), color_intensity)
-        pygame.draw.circle(surface, highlight, (x - size//3, y - size//3), size//3)
-
-def spawn_bug(color_intensity):
-    # Spawn rates: 50% ants, 25% beetles, 25% ladybugs
-    rand = random.random()
-    if rand < 0.5:
-        bug_type = "ant"
-    elif rand < 0.75:
-        bug_type = "beetle"
-    else:
-        bug_type = "ladybug"
-    
-    x = random.randint(50, WIDTH - 50)
-    y = random.randint(50, HEIGHT - 50)
-    return Bug(bug_type, x, y, color_intensity)
+    # Font
+    font = pygame.font.Font(None, 48)
+    small_font = pygame.font.Font(None, 32)
+    medium_font = pygame.font.Font(None, 36)
+    title_font = pygame.font.Font(None, 72)
 
-def draw_pause_screen(surface):
+def build_pause_screen():
     # Semi-transparent overlay
-    overlay = pygame.Surface((WIDTH, HEIGHT))
-    overlay.fill(BLACK)
-    overlay.set_alpha(200)
-    surface.blit(overlay, (0, 0))
+    overlay = ui_cache.overlay((WIDTH, HEIGHT), BLACK, 200).copy()
     
     # Pause text
-    pause_text = font.render("PAUSED", True, WHITE)
-    resume_text = medium_font.render("Press SPACE to Resume", True, WHITE)
+    pause_text = ui_cache.text(font, "PAUSED", WHITE)
+    resume_text = ui_cache.text(medium_font, "Press SPACE to Resume", WHITE)
     
-    surface.blit(pause_text, (WIDTH//2 - pause_text.get_width()//2, HEIGHT//2 - 60))
-    surface.blit(resume_text, (WIDTH//2 - resume_text.get_width()//2, HEIGHT//2 + 20))
+    overlay.blit(pause_text, (WIDTH//2 - pause_text.get_width()//2, HEIGHT//2 - 60))
+    overlay.blit(resume_text, (WIDTH//2 - resume_text.get_width()//2, HEIGHT//2 + 20))
+    return overlay
+
+def draw_pause_screen(surface):
+    surface.blit(ui_cache.get("pause", build_pause_screen), (0, 0))
 
-def draw_break_prompt(surface):
+def build_break_prompt(score):
     # Semi-transparent overlay
-    overlay = pygame.Surface((WIDTH, HEIGHT))
-    overlay.fill(BLACK)
-    overlay.set_alpha(200)
-    surface.blit(overlay, (0, 0))
+    overlay = ui_cache.overlay((WIDTH, HEIGHT), BLACK, 200).copy()
     
     # Break prompt text
-    prompt_text = medium_font.render("You've reached 15 points!", True, WHITE)
-    question_text = medium_font.render("Would you like a break?", True, WHITE)
-    yes_text = small_font.render("Press Y for Yes", True, (100, 255, 100))
-    no_text = small_font.render("Press N to Continue", True, (255, 100, 100))
+    prompt_text = ui_cache.text(medium_font, f"You've reached {score} points!", WHITE)
+    question_text = ui_cache.text(medium_font, "Would you like a break?", WHITE)
+    yes_text = ui_cache.text(small_font, "Press Y for Yes", (100, 255, 100))
+    no_text = ui_cache.text(small_font, "Press N to Continue", (255, 100, 100))
     
-    surface.blit(prompt_text, (WIDTH//2 - prompt_text.get_width()//2, HEIGHT//2 - 80))
-    surface.blit(question_text, (WIDTH//2 - question_text.get_width()//2, HEIGHT//2 - 30))
-    surface.blit(yes_text, (WIDTH//2 - yes_text.get_width()//2, HEIGHT//2 + 30))
-    surface.blit(no_text, (WIDTH//2 - no_text.get_width()//2, HEIGHT//2 + 70))
+    overlay.blit(prompt_text, (WIDTH//2 - prompt_text.get_width()//2, HEIGHT//2 - 80))
+    overlay.blit(question_text, (WIDTH//2 - question_text.get_width()//2, HEIGHT//2 - 30))
+    overlay.blit(yes_text, (WIDTH//2 - yes_text.get_width()//2, HEIGHT//2 + 30))
+    overlay.blit(no_text, (WIDTH//2 - no_text.get_width()//2, HEIGHT//2 + 70))
+    return overlay
 
-def draw_win_screen(surface, score):
+def draw_break_prompt(surface, score):
+    surface.blit(ui_cache.get(("break", score), lambda: build_break_prompt(score)), (0, 0))
+
+def build_win_screen(score):
     # Semi-transparent overlay
-    overlay = pygame.Surface((WIDTH, HEIGHT))
-    overlay.fill((50, 50, 50))
-    overlay.set_alpha(230)
-    surface.blit(overlay, (0, 0))
+    overlay = ui_cache.overlay((WIDTH, HEIGHT), (50, 50, 50), 230).copy()
     
     # Win text
-    win_text = font.render("YOU WIN!", True, (255, 215, 0))
-    score_text = medium_font.render(f"Final Score: {score}", True, WHITE)
-    restart_text = small_font.render("Press R to Restart or Q to Quit", True, WHITE)
+    win_text = ui_cache.text(font, "YOU WIN!", (255, 215, 0))
+    score_text = ui_cache.text(medium_font, f"Final Score: {score}", WHITE)
+    restart_text = ui_cache.text(small_font, "Press R to Restart or Q to Quit", WHITE)
     
-    surface.blit(win_text, (WIDTH//2 - win_text.get_width()//2, HEIGHT//2 - 80))
-    surface.blit(score_text, (WIDTH//2 - score_text.get_width()//2, HEIGHT//2 - 10))
-    surface.blit(restart_text, (WIDTH//2 - restart_text.get_width()//2, HEIGHT//2 + 50))
+    overlay.blit(win_text, (WIDTH//2 - win_text.get_width()//2, HEIGHT//2 - 80))
+    overlay.blit(score_text, (WIDTH//2 - score_text.get_width()//2, HEIGHT//2 - 10))
+    overlay.blit(restart_text, (WIDTH//2 - restart_text.get_width()//2, HEIGHT//2 + 50))
+    return overlay
+
+def draw_win_screen(surface, score):
+    surface.blit(ui_cache.get(("win", score), lambda: build_win_screen(score)), (0, 0))
 
-def draw_start_screen(surface):
+def build_start_screen(rules):
+    surface = pygame.Surface((WIDTH, HEIGHT))
+    
     # Background
     surface.fill((40, 80, 40))  # Dark green background
     
     # Title
-    title_font = pygame.font.Font(None, 72)
-    title_text = title_font.render("BUG COLLECTING", True, (255, 255, 100))
+    title_text = ui_cache.text(title_font, "BUG COLLECTING", (255, 255, 100))
     surface.blit(title_text, (WIDTH//2 - title_text.get_width()//2, 80))
     
     # Instructions
@@ -219,11 +131,9 @@ def draw_start_screen(surface):
         "How to Play:",
         "",
         "Click on bugs to collect them!",
-        "Ants = 1 point",
-        "Beetles = 2 points",
-        "Ladybugs = 3 points (fast!)",
+        *(bug_line(name, bug_type) for name, bug_type in rules.bug_types.items()),
         "",
-        "Reach 30 points to win!",
+        f"Reach {rules.win_score} points to win!" if rules.win_score else "Collect as many as you can!",
         "Press SPACE to pause anytime",
         "",
         "Colors fade as you collect..."
@@ -232,9 +142,9 @@ def draw_start_screen(surface):
     y_offset = 200
     for line in instructions:
         if line == "How to Play:":
-            text = medium_font.render(line, True, WHITE)
+            text = ui_cache.text(medium_font, line, WHITE)
         else:
-            text = small_font.render(line, True, (200, 255, 200))
+            text = ui_cache.text(small_font, line, (200, 255, 200))
         surface.blit(text, (WIDTH//2 - text.get_width()//2, y_offset))
         y_offset += 35
     
@@ -249,151 +159,249 @@ def draw_start_screen(surface):
     pygame.draw.rect(surface, WHITE, button_rect, 3, border_radius=10)
     
     # Button text
-    button_text = medium_font.render("START", True, WHITE)
+    button_text = ui_cache.text(medium_font, "START", WHITE)
     surface.blit(button_text, (WIDTH//2 - button_text.get_width()//2, button_y + 15))
     
+    return surface, button_rect
+
+def bug_line(name, bug_type):
+    points = f"{bug_type.points} point" + ("" if bug_type.points == 1 else "s")
+    # Ladybugs by default: twice as fast as the rest
+    fast = " (fast!)" if bug_type.speed > 1 else ""
+    return f"{name.capitalize()}s = {points}{fast}"
+
+def draw_start_screen(surface, rules):
+    start_screen, button_rect = ui_cache.get(("start", rules_digest(rules)), lambda: build_start_screen(rules))
+    surface.blit(start_screen, (0, 0))
     return button_rect
 
-def main():
-    game_started = False
-    bugs = []
-    score = 0
-    spawn_timer = 0
-    spawn_delay = 60
-    paused = False
-    break_prompted = False
-    game_won = False
+def build_score_panel(score):
+    score_text = ui_cache.text(font, f"Score: {score}", WHITE)
+    panel = ui_cache.overlay((score_text.get_width() + 20, score_text.get_height() + 10), BLACK, 180).copy()
+    panel.blit(score_text, (10, 5))
+    return panel
+
+def draw_score(surface, score):
+    panel = ui_cache.get(("score", score), lambda: build_score_panel(score))
+    return surface.blit(panel, (10, 10))
+
+def load_background(seed, color_intensity, levels, disk_cache):
+    # Runs on a thread, so it readies the level the game will start at too
+    background = FadingBackground(draw_background, (WIDTH, HEIGHT), seed % BACKGROUND_VARIANTS,
+                                  levels=levels, disk_cache=disk_cache, art=ART)
+    background.surface(color_intensity)
+    return background
+
+def main(dirty_rects=False, fps=FPS, profile_out=None, max_bugs=None,
+         seed=None, record=None, replay_path=None, replay_from=0, startup_report=False,
+         cache_dir=CACHE_DIR, rules_file=RULES_FILE, latency_out=None):
+    report = StartupReport()
+    # Checked before the window opens, so a bad file is reported straight away
+    rules = load_rules(rules_file, BUG_COLORS, WIDTH, HEIGHT)
+    if max_bugs is not None:
+        rules = with_max_bugs(rules, max_bugs)
+    init_display()
+    report.mark("window")
+    # Sprites and backgrounds drawn on earlier runs are loaded from here
+    disk_cache = SurfaceCache(cache_dir) if cache_dir else None
     
-    # Calculate initial color intensity
-    color_intensity = 0
+    # Every game is seeded, so a recorded seed and its inputs replay exactly
+    recorder = None
+    replay = None
+    if replay_path:
+        # Inputs come from the log instead of the mouse and keyboard
+        replay = Replay(replay_path, rules)
+        replay.seek(replay_from)
+        game = replay.game
+    else:
+        if seed is None:
+            seed = random.getrandbits(32)
+        game = BugCollectingGame(random.Random(seed), rules=rules)
+        if record:
+            recorder = InputRecorder(record, seed, game.rules)
+    steps = replay.steps if replay else 0
+    # One fade level per point on the way to the win
+    levels = (rules.win_score or 0) + 1
+    sprites = SpriteAtlas(draw_bug, levels=levels, disk_cache=disk_cache, art=ART)
+    renderer = DirtyRectRenderer(screen, enabled=dirty_rects)
     
-    # Create initial background
-    background = pygame.Surface((WIDTH, HEIGHT))
-    draw_background(background, color_intensity)
+    # Draw the background once; each color level is faded from it and cached.
+    # It is drawn (or loaded) on a thread while the start screen is showing
+    background = None
+    background_seed = game.background_seed
+    preload = Preload(load_background, background_seed, game.color_intensity, levels, disk_cache)
     
-    running = True
     start_button_rect = None
+    timestep = FixedTimestep(STEP_RATE, MAX_SUBSTEPS)
+    # Press F3 to show frame timings
+    profiler = FrameProfiler(dump_path=profile_out)
+    latency = ClickLatency(dump_path=latency_out)
     
-    while running:
-        clock.tick(FPS)
+    # The first frame goes out as soon as it is drawn; the cap applies after
+    frame_cap = 0
+    while game.running:
+        elapsed = clock.tick(frame_cap) / 1000
+        frame_cap = fps
+        profiler.begin_frame()
         
-        for event in pygame.event.get():
+        # The frame's inputs are gathered first, then applied in one go
+        inputs = []
+        events = pygame.event.get()
+        latency.read()
+        for event in events:
             if event.type == pygame.QUIT:
-                running = False
+                game.running = False
+            
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                profiler.toggle()
             
-            # Handle start screen clicks
-            if not game_started and event.type == pygame.MOUSEBUTTONDOWN:
-                mouse_pos = pygame.mouse.get_pos()
-                if start_button_rect and start_button_rect.collidepoint(mouse_pos):
-                    game_started = True
-                    # Initialize bugs when game starts
-                    for _ in range(3):
-                        bugs.append(spawn_bug(color_intensity))
-                    for _ in range(3):
-                        x = random.randint(50, WIDTH - 50)
-                        y = random.randint(50, HEIGHT - 50)
-                        bugs.append(Bug("ladybug", x, y, color_intensity))
+            if replay:
+                continue
             
-            if event.type == pygame.KEYDOWN:
-                # Pause/Resume with SPACE
-                if event.key == pygame.K_SPACE and not break_prompted and not game_won and game_started:
-                    paused = not paused
-                
-                # Break prompt response
-                if break_prompted:
-                    if event.key == pygame.K_y:
-                        paused = True
-                        break_prompted = False
-                    elif event.key == pygame.K_n:
-                        break_prompted = False
-                
-                # Win screen controls
-                if game_won:
-                    if event.key == pygame.K_r:
-                        # Restart game
-                        bugs = []
-                        score = 0
-                        spawn_timer = 0
-                        paused = False
-                        break_prompted = False
-                        game_won = False
-                        game_started = False
-                        color_intensity = 0
-                        background = pygame.Surface((WIDTH, HEIGHT))
-                        draw_background(background, color_intensity)
-                    elif event.key == pygame.K_q:
-                        running = False
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                # Handle start screen clicks, where the click happened
+                # rather than where the mouse is now
+                if not game.game_started and start_button_rect and start_button_rect.collidepoint(event.pos):
+                    inputs.append(("start",))
+                inputs.append(("click", event.pos))
             
-            if event.type == pygame.MOUSEBUTTONDOWN and not paused and not break_prompted and not game_won and game_started:
-                mouse_pos = pygame.mouse.get_pos()
-                for bug in reversed(bugs):
-                    if bug.is_clicked(mouse_pos):
-                        score += bug.points
-                        bugs.remove(bug)
-                        
-                        # Update color intensity (max desaturation at 30 points)
-                        color_intensity = min(score / 30.0, 1.0)
-                        
-                        # Redraw background with new color intensity
-                        background = pygame.Surface((WIDTH, HEIGHT))
-                        draw_background(background, color_intensity)
-                        
-                        # Check for break prompt
-                        if score == 15 and not break_prompted:
-                            break_prompted = True
-                        
-                        # Check for win
-                        if score >= 30:
-                            game_won = True
-                        
-                        break
+            if event.type == pygame.KEYDOWN and event.key in KEY_NAMES:
+                inputs.append(("key", KEY_NAMES[event.key]))
+        
+        if recorder:
+            for action in inputs:
+                recorder.record(steps, action)
+        # Runs of clicks are looked up in the swarm together
+        caught = game.handle_all(inputs)
+        latency.scored(len(caught) - caught.count(None))
+        profiler.mark("event")
         
         # Update game state only if not paused
-        if not paused and not break_prompted and not game_won and game_started:
-            # Update bugs
-            for bug in bugs:
-                bug.update()
-            
-            # Spawn new bugs with current color intensity
-            spawn_timer += 1
-            if spawn_timer >= spawn_delay and len(bugs) < 15:
-                bugs.append(spawn_bug(color_intensity))
-                spawn_timer = 0
+        for _ in range(timestep.advance(elapsed)):
+            if replay:
+                if replay.finished:
+                    # Inputs stamped with the last step came after it
+                    replay.feed()
+                    game.running = False
+                    break
+                replay.feed()
+            game.move_bugs()
+            profiler.mark("update")
+            game.spawn_bugs()
+            profiler.mark("spawn")
+            steps += 1
+            if recorder:
+                recorder.stepped(steps, game)
+            if replay:
+                replay.advance()
+        
+        # A restart picks new terrain
+        if background_seed != game.background_seed:
+            background = None
+            background_seed = game.background_seed
+            preload = Preload(load_background, background_seed, game.color_intensity, levels, disk_cache)
         
         # Draw everything
-        if not game_started:
+        if not game.game_started:
             # Draw start screen
-            start_button_rect = draw_start_screen(screen)
+            start_button_rect = draw_start_screen(screen, game.rules)
+            renderer.invalidate()
+            profiler.mark("background")
         else:
+            if background is None:
+                # Only waits if the game starts before the thread is done
+                background = preload.result()
+                report.mark("background ready", preload.finished_at)
+            
             # Draw game
-            screen.blit(background, (0, 0))
+            renderer.begin(background.surface(game.color_intensity))
+            profiler.mark("background")
             
-            for bug in bugs:
-                bug.draw(screen)
+            renderer.add(sprites.draw_swarm(screen, game.bugs, rects=dirty_rects,
+                                              alpha=game.draw_alpha(timestep.alpha)))
             
             # Draw score
-            score_text = font.render(f"Score: {score}", True, WHITE)
-            score_bg = pygame.Surface((score_text.get_width() + 20, score_text.get_height() + 10))
-            score_bg.fill(BLACK)
-            score_bg.set_alpha(180)
-            screen.blit(score_bg, (10, 10))
-            screen.blit(score_text, (20, 15))
+            renderer.add([draw_score(screen, game.score)])
+            
+            # Overlays cover the whole screen, so those frames are pushed in full
+            if game.paused or game.break_prompted or game.game_won:
+                renderer.invalidate()
             
             # Draw pause indicator
-            if paused and not break_prompted:
+            if game.paused and not game.break_prompted:
                 draw_pause_screen(screen)
             
             # Draw break prompt
-            if break_prompted:
-                draw_break_prompt(screen)
+            if game.break_prompted:
+                draw_break_prompt(screen, game.score)
             
             # Draw win screen
-            if game_won:
-                draw_win_screen(screen, score)
+            if game.game_won:
+                draw_win_screen(screen, game.score)
         
-        pygame.display.flip()
+        overlay_rect = profiler.draw(screen)
+        if overlay_rect:
+            renderer.add([overlay_rect])
+        profiler.mark("draw")
+        
+        renderer.present()
+        report.mark("first frame")
+        if game.game_started:
+            report.mark("first game frame")
+        latency.shown()
+        profiler.mark("flip")
+        profiler.end_frame()
     
+    if recorder:
+        recorder.close(steps, game)
+    if replay and replay.diverged_at is not None:
+        print(f"replay DIVERGED from the recording by step {replay.diverged_at}")
+    elif replay and replay.steps >= replay.end:
+        # Closing the window partway through a replay says nothing either way
+        print("replay matches the recording" if replay.matches() else "replay DIVERGED from the recording")
+    if startup_report:
+        report.print()
+    if latency_out:
+        latency.print()
+    latency.close()
+    profiler.close()
     pygame.quit()
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Bug Clicker Game")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="only redraw the parts of the screen that changed each frame")
+    parser.add_argument("--fps", type=int, default=FPS,
+                        help="frame rate cap, 0 for uncapped; game speed stays the same")
+    parser.add_argument("--profile-out", default=None,
+                        help="write per-frame phase timings here at exit (.csv or .jsonl)")
+    parser.add_argument("--max-bugs", type=int, default=None,
+                        help="size of the bug pool, the most bugs on screen at once; overrides the rules")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed for the game's random numbers; random if not given")
+    parser.add_argument("--record", default=None, metavar="LOG",
+                        help="write the seed and every input to this binary log")
+    parser.add_argument("--replay", default=None, metavar="LOG",
+                        help="play back a log from --record at real speed instead of taking input")
+    parser.add_argument("--replay-from", type=int, default=0, metavar="STEP",
+                        help="with --replay, fast-forward to this step before showing anything")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="print how long the window, first frame and background took, at exit")
+    parser.add_argument("--cache-dir", default=CACHE_DIR,
+                        help="keep drawn sprites and backgrounds here between runs")
+    parser.add_argument("--no-disk-cache", action="store_true",
+                        help="draw everything from scratch and don't save it")
+    parser.add_argument("--rules", default=RULES_FILE,
+                        help="rules file with bug sizes, spawn rates and scores")
+    parser.add_argument("--latency-out", default=None,
+                        help="write each scoring click's latency here (.csv or .jsonl) and print a summary at exit")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    main(dirty_rects=args.dirty_rects, fps=args.fps, profile_out=args.profile_out,
+         max_bugs=args.max_bugs, seed=args.seed, record=args.record,
+         replay_path=args.replay, replay_from=args.replay_from,
+         startup_report=args.startup_report,
+         cache_dir=None if args.no_disk_cache else args.cache_dir, rules_file=args.rules,
+         latency_out=args.latency_out)
\ No newline at end of file
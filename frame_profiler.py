@@ -0,0 +1,101 @@
+import json
+import time
+
+import numpy as np
+import pygame
+
+PHASES = ("event", "update", "spawn", "background", "draw", "flip")
+
+class FrameProfiler:
+    """Times each phase of a frame and keeps percentiles over recent frames"""
+
+    def __init__(self, phases=PHASES, window=600, dump_path=None, refresh=30):
+        self.phases = phases
+        self.columns = {phase: i for i, phase in enumerate(phases)}
+        # Ring buffer of the last `window` frames, in milliseconds; the last
+        # column is the whole frame
+        self.samples = np.zeros((window, len(phases) + 1))
+        self.current = np.zeros(len(phases) + 1)
+        self.frames = 0
+        self.frame_start = 0.0
+        self.last_mark = 0.0
+        self.visible = False
+        # The overlay is only re-rendered every `refresh` frames
+        self.refresh = refresh
+        self.overlay = None
+        self.font = None
+
+        self.dump = None
+        self.dump_csv = False
+        if dump_path:
+            self.dump = open(dump_path, "w", buffering=1 << 16)
+            self.dump_csv = dump_path.endswith(".csv")
+            if self.dump_csv:
+                self.dump.write("frame," + ",".join(phases) + ",total\n")
+
+    def begin_frame(self):
+        self.frame_start = self.last_mark = time.perf_counter()
+        self.current[:] = 0
+
+    def mark(self, phase):
+        """Charge the time since the last mark to phase; repeat marks add up"""
+        now = time.perf_counter()
+        self.current[self.columns[phase]] += (now - self.last_mark) * 1000
+        self.last_mark = now
+
+    def end_frame(self):
+        self.current[-1] = (time.perf_counter() - self.frame_start) * 1000
+        self.samples[self.frames % len(self.samples)] = self.current
+        if self.dump:
+            if self.dump_csv:
+                self.dump.write(f"{self.frames}," + ",".join(f"{ms:.4f}" for ms in self.current) + "\n")
+            else:
+                row = dict(zip(self.phases, self.current.round(4).tolist()))
+                row["frame"] = self.frames
+                row["total"] = round(float(self.current[-1]), 4)
+                self.dump.write(json.dumps(row) + "\n")
+        self.frames += 1
+
+    def percentiles(self):
+        """{phase: (p50, p95, p99)} in milliseconds over the recent frames"""
+        filled = self.samples[:min(self.frames, len(self.samples))]
+        if not len(filled):
+            return {}
+        table = np.percentile(filled, [50, 95, 99], axis=0)
+        names = self.phases + ("total",)
+        return {name: tuple(table[:, i].tolist()) for i, name in enumerate(names)}
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.overlay = None
+
+    def draw(self, surface):
+        """Draw the overlay in the top right corner; returns its rect, or None"""
+        if not self.visible:
+            return None
+        if self.overlay is None or self.frames % self.refresh == 0:
+            self.overlay = self.render_overlay()
+        return surface.blit(self.overlay, (surface.get_width() - self.overlay.get_width() - 10, 10))
+
+    def render_overlay(self):
+        if self.font is None:
+            # Monospace so the columns line up; only loaded once the overlay is shown
+            self.font = pygame.font.SysFont("monospace", 15)
+        lines = ["phase       p50    p95    p99 ms"]
+        for name, (p50, p95, p99) in self.percentiles().items():
+            lines.append(f"{name:<10}{p50:6.2f} {p95:6.2f} {p99:6.2f}")
+        texts = [self.font.render(line, True, (255, 255, 255)) for line in lines]
+        width = max(text.get_width() for text in texts) + 16
+        height = sum(text.get_height() for text in texts) + 12
+        overlay = pygame.Surface((width, height), pygame.SRCALPHA)
+        overlay.fill((0, 0, 0, 190))
+        y = 6
+        for text in texts:
+            overlay.blit(text, (8, y))
+            y += text.get_height()
+        return overlay
+
+    def close(self):
+        if self.dump:
+            self.dump.close()
+            self.dump = None
@@ -0,0 +1,142 @@
+import json
+import os
+import zlib
+from bisect import bisect_right
+from collections import namedtuple
+
+from bug_swarm import BugType
+
+RULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules")
+
+# Everything a game's loop needs to know about its rules, checked once and
+# worked out ahead of time. bug_types maps names to BugType records;
+# spawn_table holds each type's share of spawns added up, so picking a
+# type is one bisect; start_extra is (bug type, count) pairs spawned after
+# the start_bugs random ones; break_score and win_score may be None
+Rules = namedtuple("Rules", [
+    "bug_types", "type_names", "spawn_table",
+    "max_bugs", "spawn_delay", "spawn_count", "spawn_margin",
+    "start_bugs", "start_extra", "break_score", "win_score",
+])
+
+class RulesError(ValueError):
+    """A rules file that can't be used; the message lists every problem"""
+
+def whole_number(value, minimum=0):
+    # bool is an int subclass, but true isn't a count
+    return isinstance(value, int) and not isinstance(value, bool) and value >= minimum
+
+def load_rules(path, colors, width, height):
+    with open(path, encoding="utf-8") as file:
+        data = json.load(file)
+    return build_rules(data, colors, width, height, path)
+
+def build_rules(data, colors, width, height, source="rules"):
+    """Check and precompute rules given as a dict
+
+    colors maps each bug type the game can draw to its color, and width
+    and height are the play field the bugs spawn in. The dict
+    has "bugs", mapping type names to {"size", "points", "speed",
+    "weight"}, and the numbers "max_bugs", "spawn_delay" (steps between
+    spawns), "spawn_count" (bugs per spawn), "spawn_margin", "start_bugs",
+    "start_extra" ({type: count}), "break_score" and "win_score".
+    """
+    if not isinstance(data, dict):
+        raise RulesError(f"{source}: the rules must be an object, not {type(data).__name__}")
+    problems = []
+
+    def number(key, minimum=0, required=True, default=None):
+        value = data.get(key, default)
+        if value is None and not required:
+            return None
+        if not whole_number(value, minimum):
+            problems.append(f"{key} must be a whole number of at least {minimum}, not {value!r}")
+            return minimum
+        return value
+
+    bug_types = {}
+    weights = []
+    raw_bugs = data.get("bugs", {})
+    if not isinstance(raw_bugs, dict):
+        problems.append(f"bugs must be an object mapping type names to bug types, not {type(raw_bugs).__name__}")
+        raw_bugs = {}
+    elif not raw_bugs:
+        problems.append("no bug types are given")
+    for name, raw in raw_bugs.items():
+        if name not in colors:
+            problems.append(f"bug type {name!r} isn't one this game can draw ({', '.join(colors)})")
+            continue
+        if not isinstance(raw, dict):
+            problems.append(f"bug type {name!r} must be an object, not {type(raw).__name__}")
+            continue
+        fields = {key: raw.get(key) for key in ("size", "points", "speed", "weight")}
+        bad = [key for key, value in fields.items()
+               if not isinstance(value, (int, float)) or isinstance(value, bool) or value < 0]
+        if bad or fields["size"] <= 0:
+            problems.append(f"bug type {name!r} needs a positive size and non-negative points, "
+                            f"speed and weight, not {fields}")
+            continue
+        bug_types[name] = BugType(fields["size"], fields["points"], fields["speed"], tuple(colors[name]))
+        weights.append(fields["weight"])
+
+    spawn_table = []
+    total = sum(weights)
+    if bug_types and total <= 0:
+        problems.append("at least one bug type needs a spawn weight above 0")
+    elif bug_types:
+        running = 0
+        for weight in weights:
+            running += weight
+            spawn_table.append(running / total)
+        # Never below a random() draw, whatever the rounding
+        spawn_table[-1] = 1.0
+
+    start_extra = []
+    raw_extra = data.get("start_extra", {})
+    if not isinstance(raw_extra, dict):
+        problems.append(f"start_extra must be an object mapping type names to counts, not {type(raw_extra).__name__}")
+        raw_extra = {}
+    for name, count in raw_extra.items():
+        if name not in bug_types:
+            problems.append(f"start_extra names unknown bug type {name!r}")
+        elif not whole_number(count):
+            problems.append(f"start_extra count for {name!r} must be a whole number, not {count!r}")
+        else:
+            start_extra.append((name, count))
+
+    rules = Rules(
+        bug_types=bug_types,
+        type_names=tuple(bug_types),
+        spawn_table=tuple(spawn_table),
+        max_bugs=number("max_bugs", 1),
+        spawn_delay=number("spawn_delay", 1),
+        spawn_count=number("spawn_count", 1, default=1),
+        spawn_margin=number("spawn_margin", 0, default=0),
+        start_bugs=number("start_bugs", 0, default=0),
+        start_extra=tuple(start_extra),
+        break_score=number("break_score", 1, required=False),
+        win_score=number("win_score", 1, required=False),
+    )
+    # Bugs spawn between spawn_margin and the far side less spawn_margin
+    if rules.spawn_margin * 2 > min(width, height):
+        problems.append(f"spawn_margin ({rules.spawn_margin}) leaves no room to spawn in a "
+                        f"{width}x{height} field; it can be at most {min(width, height) // 2}")
+    if rules.break_score is not None and rules.win_score is not None and rules.break_score >= rules.win_score:
+        problems.append(f"break_score ({rules.break_score}) must be below win_score ({rules.win_score})")
+    if problems:
+        raise RulesError(f"{source}: " + "; ".join(problems))
+    return rules
+
+def with_max_bugs(rules, max_bugs, source="max_bugs override"):
+    """rules with another pool size, checked as strictly as the rules file's"""
+    if not whole_number(max_bugs, 1):
+        raise RulesError(f"{source}: max_bugs must be a whole number of at least 1, not {max_bugs!r}")
+    return rules._replace(max_bugs=max_bugs)
+
+def pick_bug_type(rules, rng):
+    """A bug type drawn by spawn weight, from one rng.random() call"""
+    return rules.type_names[bisect_right(rules.spawn_table, rng.random())]
+
+def rules_digest(rules):
+    """A CRC of the rules, to tell whether two runs played by the same ones"""
+    return zlib.crc32(repr(tuple(rules)).encode())
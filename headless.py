@@ -0,0 +1,122 @@
+import argparse
+import random
+import time
+
+from bug_collecting import BUG_COLORS, HEIGHT, RULES, RULES_FILE, WIDTH, BugCollectingGame
+from game_rules import load_rules
+
+# Inputs are the tuples BugCollectingGame.handle() takes
+
+class ScriptedInput:
+    """Plays back a fixed list of (frame, input) pairs"""
+
+    def __init__(self, events):
+        self.events = sorted(events, key=lambda event: event[0])
+        self.next = 0
+
+    def __call__(self, game, frame):
+        inputs = []
+        while self.next < len(self.events) and self.events[self.next][0] <= frame:
+            inputs.append(self.events[self.next][1])
+            self.next += 1
+        return inputs
+
+class RandomClicker:
+    """A policy that clicks near a random bug every few frames"""
+
+    def __init__(self, rng, every=20, miss=15.0, take_break=False):
+        self.rng = rng
+        self.every = every
+        # Standard deviation, in pixels, of how far a click lands from the bug
+        self.miss = miss
+        self.take_break = take_break
+
+    def __call__(self, game, frame):
+        if not game.game_started:
+            return [("start",)]
+        if game.break_prompted:
+            return [("key", "y" if self.take_break else "n")]
+        if game.paused:
+            return [("key", "space")]
+        if frame % self.every:
+            return []
+
+        bugs = game.bugs
+        if not len(bugs):
+            return []
+        x, y = bugs.position(self.rng.randrange(len(bugs)))
+        x += self.rng.gauss(0, self.miss)
+        y += self.rng.gauss(0, self.miss)
+        return [("click", (float(x), float(y)))]
+
+class HeadlessSession:
+    """One bug collecting game run with no display and no frame cap"""
+
+    def __init__(self, seed, policy=None, milestones=None, max_bugs=None, rules=RULES):
+        self.seed = seed
+        self.game = BugCollectingGame(random.Random(seed), max_bugs, rules)
+        # The policy gets its own rng so it never shifts the game's random stream
+        self.policy = policy or RandomClicker(random.Random(f"policy-{seed}"))
+        if milestones is None:
+            # The break and win scores, where the rules have them
+            milestones = [score for score in (rules.break_score, rules.win_score) if score is not None]
+        self.milestones = sorted(milestones)
+        self.frame = 0
+        self.clicks = 0
+        self.hits = {bug_type: 0 for bug_type in rules.bug_types}
+        # First frame the score reached each milestone
+        self.milestone_frames = {}
+
+    def apply(self, action):
+        game = self.game
+        if action[0] == "click" and game.playing:
+            self.clicks += 1
+        bug_type = game.handle(action)
+        if bug_type is not None:
+            self.hits[bug_type] += 1
+            for milestone in self.milestones:
+                if game.score >= milestone and milestone not in self.milestone_frames:
+                    self.milestone_frames[milestone] = self.frame
+
+    def run(self, max_frames=100000):
+        """Play until the game is won, quit, or max_frames have gone by"""
+        game = self.game
+        while self.frame < max_frames and game.running and not game.game_won:
+            for action in self.policy(game, self.frame):
+                self.apply(action)
+            game.step()
+            self.frame += 1
+        return self.result()
+
+    def result(self):
+        hits = sum(self.hits.values())
+        return {
+            "seed": self.seed,
+            "frames": self.frame,
+            "score": self.game.score,
+            "won": self.game.game_won,
+            "clicks": self.clicks,
+            "hits": dict(self.hits),
+            "hit_ratio": hits / self.clicks if self.clicks else 0.0,
+            "milestone_frames": {str(score): frame for score, frame in self.milestone_frames.items()},
+        }
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run bug collecting games with no window")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first session")
+    parser.add_argument("--sessions", type=int, default=1, help="number of sessions, one seed each")
+    parser.add_argument("--max-frames", type=int, default=100000, help="frame limit per session")
+    parser.add_argument("--rules", default=RULES_FILE, help="rules file to play by")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    start = time.perf_counter()
+    frames = 0
+    rules = load_rules(args.rules, BUG_COLORS, WIDTH, HEIGHT)
+    for seed in range(args.seed, args.seed + args.sessions):
+        result = HeadlessSession(seed, rules=rules).run(args.max_frames)
+        frames += result["frames"]
+        print(result)
+    elapsed = time.perf_counter() - start
+    print(f"{frames} frames in {elapsed:.2f}s ({frames / elapsed * 60:,.0f} frames per minute)")
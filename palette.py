@@ -0,0 +1,56 @@
+from array import array
+
+import numpy as np
+
+# Intensity steps stored per color, from 0 (full color) to 1 (gray)
+PALETTE_STEPS = 256
+
+def blend_to_gray(color, intensity):
+    """The float formula the tables are built from"""
+    r, g, b = color
+    gray = (r + g + b) / 3
+    return (int(r + (gray - r) * intensity),
+            int(g + (gray - g) * intensity),
+            int(b + (gray - b) * intensity))
+
+class Palette:
+    """Known colors desaturated ahead of time at PALETTE_STEPS intensities"""
+
+    def __init__(self, colors, steps=PALETTE_STEPS):
+        self.steps = steps
+        self.scale = steps - 1
+        self.rows = {}
+        # One flat byte array per color: steps * (r, g, b)
+        for color in colors:
+            color = tuple(color)
+            if color in self.rows:
+                continue
+            row = array("B")
+            for step in range(steps):
+                row.extend(blend_to_gray(color, step / self.scale))
+            self.rows[color] = row
+
+    def desaturate(self, color, intensity):
+        row = self.rows.get(color)
+        if row is None:
+            r, g, b = color
+            if r == g == b:
+                # Gray is already as desaturated as it gets
+                return color
+            return blend_to_gray(color, intensity)
+        i = int(intensity * self.scale + 0.5) * 3
+        return (row[i], row[i + 1], row[i + 2])
+
+def gray_offsets(pixels):
+    """Per-pixel distance to gray for an (..., 3) array, as float32"""
+    pixels = pixels.astype(np.float32)
+    return pixels.mean(axis=-1, keepdims=True) - pixels
+
+def desaturate_pixels(pixels, intensity, offsets=None):
+    """Desaturate a whole (..., 3) pixel array at once; returns uint8
+
+    Pass offsets from gray_offsets() to reuse them across intensities.
+    """
+    if offsets is None:
+        offsets = gray_offsets(pixels)
+    return (pixels + offsets * intensity).astype(np.uint8)
@@ -0,0 +1,280 @@
+import argparse
+import copy
+import random
+import struct
+import time
+import zlib
+from bisect import bisect_left
+
+from bug_collecting import BUG_COLORS, HEIGHT, RULES, RULES_FILE, WIDTH
+from game_rules import load_rules, rules_digest
+from headless import HeadlessSession, ScriptedInput
+
+# A log is a header, then one record per input in the order they were
+# applied. Inputs are stamped with the number of world steps run before
+# them, which is all a replay needs to apply them at the same moment.
+MAGIC = b"BUGR"
+# Version 2: bugs move by wall-hit events, which rounds differently from
+# the per-step motion version 1 logs were made with. Version 3: the
+# header says which rules the game was played by. Version 4: the pool
+# size is 32 bits, since rules files can ask for more than 65535 bugs.
+# Version 5: snapshot records of the whole game every SNAPSHOT_EVERY steps
+VERSION = 5
+# magic, version, game seed, bug pool size, rules_digest() of the rules
+HEADER = struct.Struct("<4sBQII")
+# steps run so far, record kind
+RECORD = struct.Struct("<IB")
+CLICK = struct.Struct("<dd")
+KEY = struct.Struct("<B")
+# state_digest() of the game when recording stopped
+END = struct.Struct("<I")
+# A snapshot record is its length in bytes, then SNAPSHOT, the game rng's
+# state and the bug swarm's rows (BugSwarm.save_rows())
+SNAPSHOT_SIZE = struct.Struct("<I")
+# score is an int, score, spawn timer, paused, break prompted, won,
+# started, running, color intensity, background seed, swarm steps, bugs,
+# rng has a spare gauss, the spare gauss, state_digest() of the game
+SNAPSHOT = struct.Struct("<?dI?????dQII?dI")
+# Mersenne Twister state: 624 words and the position in them
+RNG_STATE = struct.Struct("<625I")
+
+START, CLICKED, KEY_PRESSED, ENDED, SNAPSHOTTED = range(5)
+KEYS = ("space", "y", "n", "r", "q")
+
+# Snapshot the game every this many steps, in the log as it is recorded
+# and in memory as a replay goes, so seeking anywhere is quick
+SNAPSHOT_EVERY = 600
+
+def state_digest(game):
+    """A CRC of everything that decides how the game goes on from here"""
+    bugs = game.bugs
+    n = bugs.count
+    crc = zlib.crc32(repr((game.score, game.spawn_timer, game.paused, game.break_prompted,
+                           game.game_won, game.game_started, game.background_seed,
+                           bugs.time, game.rng.getstate())).encode())
+    for column in bugs._columns():
+        crc = zlib.crc32(column[:n].tobytes(), crc)
+    return crc
+
+def save_state(game):
+    """Everything restore_state() needs to carry on a game from where it is"""
+    bugs = game.bugs
+    version, rng_state, gauss = game.rng.getstate()
+    header = SNAPSHOT.pack(isinstance(game.score, int), game.score, game.spawn_timer, game.paused,
+                           game.break_prompted, game.game_won, game.game_started, game.running,
+                           game.color_intensity, game.background_seed, bugs.time, bugs.count,
+                           gauss is not None, gauss or 0.0, state_digest(game))
+    return header + RNG_STATE.pack(*rng_state) + bugs.save_rows()
+
+def restore_state(game, data):
+    """Put a game back as save_state() found it; returns the digest it had then"""
+    (score_is_int, score, game.spawn_timer, game.paused, game.break_prompted, game.game_won,
+     game.game_started, game.running, game.color_intensity, game.background_seed, time, count,
+     has_gauss, gauss, digest) = SNAPSHOT.unpack_from(data)
+    game.score = int(score) if score_is_int else score
+    rng_state = RNG_STATE.unpack_from(data, SNAPSHOT.size)
+    game.rng.setstate((random.Random.VERSION, rng_state, gauss if has_gauss else None))
+    game.bugs.restore_rows(count, time, data[SNAPSHOT.size + RNG_STATE.size:])
+    return digest
+
+class InputRecorder:
+    """Writes a binary log of a session's seed and inputs, with a snapshot every so often"""
+
+    def __init__(self, path, seed, rules=RULES, snapshot_every=SNAPSHOT_EVERY):
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed, rules.max_bugs, rules_digest(rules)))
+        self.snapshot_every = snapshot_every
+
+    def record(self, step, action):
+        if action[0] == "start":
+            self.file.write(RECORD.pack(step, START))
+        elif action[0] == "click":
+            self.file.write(RECORD.pack(step, CLICKED) + CLICK.pack(*action[1]))
+        elif action[0] == "key":
+            self.file.write(RECORD.pack(step, KEY_PRESSED) + KEY.pack(KEYS.index(action[1])))
+
+    def stepped(self, step, game):
+        """Call after each step with the steps run so far; snapshots the game when one is due"""
+        if step % self.snapshot_every == 0:
+            state = save_state(game)
+            self.file.write(RECORD.pack(step, SNAPSHOTTED) + SNAPSHOT_SIZE.pack(len(state)) + state)
+
+    def close(self, step, game):
+        """End the log with the step count and a digest to check replays against"""
+        self.file.write(RECORD.pack(step, ENDED) + END.pack(state_digest(game)))
+        self.file.close()
+
+def read_log(path):
+    """Returns (seed, max_bugs, rules digest, [(step, input)], {step: snapshot}, end step,
+    end digest or None)"""
+    with open(path, "rb") as file:
+        data = file.read()
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path} is not a version {VERSION} input log")
+    magic, version, seed, max_bugs, rules_crc = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} input log")
+
+    events = []
+    snapshots = {}
+    end, digest = 0, None
+    offset = HEADER.size
+    view = memoryview(data)
+    while offset < len(data):
+        step, kind = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        end = step
+        if kind == START:
+            events.append((step, ("start",)))
+        elif kind == CLICKED:
+            events.append((step, ("click", CLICK.unpack_from(data, offset))))
+            offset += CLICK.size
+        elif kind == KEY_PRESSED:
+            events.append((step, ("key", KEYS[KEY.unpack_from(data, offset)[0]])))
+            offset += KEY.size
+        elif kind == SNAPSHOTTED:
+            size, = SNAPSHOT_SIZE.unpack_from(data, offset)
+            offset += SNAPSHOT_SIZE.size
+            # Left as a view into the log; only decoded if a seek lands on it
+            snapshots[step] = view[offset:offset + size]
+            offset += size
+        elif kind == ENDED:
+            digest = END.unpack_from(data, offset)[0]
+            offset += END.size
+        else:
+            raise ValueError(f"{path} has an unknown record at byte {offset - RECORD.size}")
+    # A log cut short by a crash has no end record; play up to its last input
+    return seed, max_bugs, rules_crc, events, snapshots, end, digest
+
+class Replay:
+    """Re-runs a recorded session step by step, and can seek through it
+
+    A seek starts from the nearest snapshot at or before where it is
+    going: one kept in memory from earlier in this replay, or one the
+    recorder wrote into the log, so even a fresh process jumps deep into
+    a long session without simulating it from step 0. The session's
+    click and hit counts come from simulating, though, so after starting
+    from a log snapshot they only count from there; run() always plays
+    the whole log.
+    """
+
+    def __init__(self, path, rules=RULES, snapshot_every=SNAPSHOT_EVERY):
+        self.seed, self.max_bugs, rules_crc, events, self.saved, self.end, self.digest = read_log(path)
+        self.rules = rules._replace(max_bugs=self.max_bugs)
+        if rules_digest(self.rules) != rules_crc:
+            raise ValueError(f"{path} was recorded with different rules; replay it with the same rules file")
+        self.events = events
+        self.session = HeadlessSession(self.seed, ScriptedInput(events), rules=self.rules)
+        self.snapshot_every = snapshot_every
+        # Copies of the whole session, taken as the replay first reaches them
+        self.snapshots = {0: self.copy(self.session)}
+        # First step where the game didn't match the log's snapshot, if any
+        self.diverged_at = None
+
+    @staticmethod
+    def copy(session):
+        # The input list never changes, so every copy shares it
+        events = session.policy.events
+        return copy.deepcopy(session, {id(events): events})
+
+    @property
+    def game(self):
+        return self.session.game
+
+    @property
+    def steps(self):
+        return self.session.frame
+
+    @property
+    def finished(self):
+        return self.steps >= self.end or not self.game.running
+
+    def feed(self):
+        """Apply the inputs recorded before the next step"""
+        session = self.session
+        for action in session.policy(session.game, session.frame):
+            session.apply(action)
+
+    def advance(self):
+        """Count a step the caller has just run on the game"""
+        self.session.frame += 1
+        steps = self.steps
+        if steps in self.saved and self.diverged_at is None:
+            # Check against the recording as we go, not just at the end
+            if state_digest(self.game) != SNAPSHOT.unpack_from(self.saved[steps])[-1]:
+                self.diverged_at = steps
+        if steps % self.snapshot_every == 0 and steps not in self.snapshots:
+            self.snapshots[steps] = self.copy(self.session)
+
+    def step(self):
+        self.feed()
+        self.game.step()
+        self.advance()
+
+    def seek(self, step, from_log=True):
+        """Jump to just before step runs, from the nearest snapshot at or before it
+
+        With from_log=False only this replay's own snapshots are used, so
+        every step up to there is simulated and checked.
+        """
+        step = min(step, self.end)
+        base = max(saved for saved in self.snapshots if saved <= step)
+        if from_log:
+            base = max([base] + [saved for saved in self.saved if saved <= step])
+        if not base <= self.steps <= step:
+            if base in self.snapshots:
+                self.session = self.copy(self.snapshots[base])
+            else:
+                self.session = self.restore(base)
+        while self.steps < step and self.game.running:
+            self.step()
+
+    def restore(self, step):
+        """A session carrying on from the log's snapshot at step"""
+        session = HeadlessSession(self.seed, ScriptedInput(self.events), rules=self.rules)
+        if restore_state(session.game, self.saved[step]) != state_digest(session.game):
+            raise ValueError(f"the snapshot at step {step} doesn't restore to the game it was taken from")
+        session.frame = step
+        # Inputs stamped before the snapshot were applied before it was taken
+        policy = session.policy
+        policy.next = bisect_left(policy.events, step, key=lambda event: event[0])
+        self.snapshots[step] = self.copy(session)
+        return session
+
+    def run(self):
+        """Play to the end of the log as fast as possible, checking every snapshot"""
+        self.seek(self.end, from_log=False)
+        # Inputs stamped with the last step came after it
+        self.feed()
+        return self.session.result()
+
+    def matches(self):
+        """Whether the game ended up exactly where the recording did"""
+        if self.diverged_at is not None:
+            return False
+        return self.digest is None or state_digest(self.game) == self.digest
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Play back a recorded bug collecting session with no window")
+    parser.add_argument("log", help="input log written with --record")
+    parser.add_argument("--seek", type=int, default=None,
+                        help="stop just before this step and print the game state there")
+    parser.add_argument("--rules", default=RULES_FILE, help="rules file the log was recorded with")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    start = time.perf_counter()
+    replay = Replay(args.log, load_rules(args.rules, BUG_COLORS, WIDTH, HEIGHT))
+    if args.seek is not None:
+        replay.seek(args.seek)
+        game = replay.game
+        print(f"step {replay.steps}: score {game.score}, {len(game.bugs)} bugs, digest {state_digest(game):08x}")
+    else:
+        print(replay.run())
+        if replay.diverged_at is not None:
+            print(f"replay DIVERGED from the recording by step {replay.diverged_at}")
+        else:
+            print("replay matches the recording" if replay.matches() else "replay DIVERGED from the recording")
+    elapsed = time.perf_counter() - start
+    print(f"{replay.steps} steps in {elapsed:.2f}s")
@@ -0,0 +1,82 @@
+import math
+
+import numpy as np
+
+
+class SpatialHash:
+    """Uniform grid over the play field for finding bugs near a point
+
+    The grid files each row where it was when the grid was built. Rows keep
+    moving after that, so near() looks further out the longer ago that was,
+    and whoever owns the rows rebuilds the grid before it has to look far.
+    """
+
+    def __init__(self, width, height, cell_size):
+        self.cell_size = cell_size
+        self.cols = int(math.ceil(width / cell_size)) or 1
+        self.rows = int(math.ceil(height / cell_size)) or 1
+        self.order = np.zeros(0, dtype=np.intp)
+        self.starts = np.zeros(self.cols * self.rows + 1, dtype=np.intp)
+        # Where each row is in self.order
+        self.slot = np.zeros(0, dtype=np.intp)
+        # Step the grid was built at, and the furthest a filed row can move
+        # along an axis in a step
+        self.built = 0
+        self.speed = 0.0
+        # Rows added or moved since the last rebuild, checked one by one
+        self.extra = []
+
+    def _coordinate(self, position, count):
+        return min(max(math.floor(position / self.cell_size), 0), count - 1)
+
+    def rebuild(self, x, y, step, speed):
+        # Rows sorted by cell with a stable argsort, which keeps draw order
+        # inside each cell, and where each cell's run starts
+        cols = np.clip((x // self.cell_size).astype(np.intp), 0, self.cols - 1)
+        rows = np.clip((y // self.cell_size).astype(np.intp), 0, self.rows - 1)
+        cells = rows * self.cols + cols
+        self.order = np.argsort(cells, kind="stable")
+        counts = np.bincount(cells, minlength=self.cols * self.rows)
+        self.starts[0] = 0
+        np.cumsum(counts, out=self.starts[1:])
+        self.slot = np.empty_like(self.order)
+        self.slot[self.order] = np.arange(len(self.order))
+        self.built = step
+        self.speed = speed
+        self.extra = []
+
+    def insert(self, index):
+        self.extra.append(index)
+
+    def _filed(self, index):
+        return index < len(self.slot) and self.order[self.slot[index]] == index
+
+    def remove(self, index, last):
+        """Forget row index, then call row last index, as BugSwarm.remove() does"""
+        if self._filed(index):
+            # -1 marks a hole, skipped by near()
+            self.order[self.slot[index]] = -1
+        if index != last and self._filed(last):
+            self.order[self.slot[last]] = index
+            self.slot[index] = self.slot[last]
+        self.extra = [index if row == last else row for row in self.extra if row != index]
+
+    def near(self, x, y, step):
+        """Row indices of everything that can be within a cell of a point at step"""
+        # As far again as any filed row can have moved since the build
+        reach = self.cell_size + (step - self.built) * self.speed
+        first_col = self._coordinate(x - reach, self.cols)
+        last_col = self._coordinate(x + reach, self.cols)
+        chunks = []
+        for r in range(self._coordinate(y - reach, self.rows), self._coordinate(y + reach, self.rows) + 1):
+            # Neighbouring cells in one grid row are next to each other in self.order
+            start = self.starts[r * self.cols + first_col]
+            end = self.starts[r * self.cols + last_col + 1]
+            if end > start:
+                chunks.append(self.order[start:end])
+        if self.extra:
+            chunks.append(np.array(self.extra, dtype=np.intp))
+        if not chunks:
+            return self.order[:0]
+        found = np.concatenate(chunks)
+        return found[found >= 0]
@@ -0,0 +1,52 @@
+import sys
+import threading
+import time
+
+
+class StartupReport:
+    """Milliseconds from main() starting to each step of getting on screen"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marks = {}
+
+    def mark(self, name, when=None):
+        # Only the first time counts, so marks can sit inside the main loop
+        if name not in self.marks:
+            when = time.perf_counter() if when is None else when
+            self.marks[name] = (when - self.start) * 1000
+
+    def lines(self):
+        return [f"{name:<20}{ms:8.1f} ms" for name, ms in sorted(self.marks.items(), key=lambda mark: mark[1])]
+
+    def print(self, file=sys.stderr):
+        print("startup", file=file)
+        for line in self.lines():
+            print("  " + line, file=file)
+
+class Preload:
+    """Calls function(*args) on a background thread; result() waits for it"""
+
+    def __init__(self, function, *args):
+        self.value = None
+        self.error = None
+        self.finished_at = None
+        self.thread = threading.Thread(target=self._run, args=(function, args), daemon=True)
+        self.thread.start()
+
+    def _run(self, function, args):
+        try:
+            self.value = function(*args)
+        except BaseException as error:
+            self.error = error
+        self.finished_at = time.perf_counter()
+
+    @property
+    def ready(self):
+        return not self.thread.is_alive()
+
+    def result(self):
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.value
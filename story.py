@@ -0,0 +1,168 @@
+import json
+import os
+from collections import deque, namedtuple
+from types import MappingProxyType
+
+# The adventure every story tool plays or reads unless told otherwise
+STORY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stories", "wild_west.json")
+
+# One place in a story. choices is a tuple of (label, index of the node it
+# leads to); an ending has no choices
+Node = namedtuple("Node", ["id", "text", "choices", "ending"])
+
+# A loaded, checked story. nodes is a tuple and index maps node ids to
+# positions in it, so every lookup is O(1)
+Story = namedtuple("Story", ["title", "greeting", "intro", "farewell", "start", "nodes", "index"])
+
+class StoryError(ValueError):
+    """A story file that can't be played; the message lists every problem"""
+
+def load_story(path):
+    with open(path, encoding="utf-8") as file:
+        data = json.load(file)
+    return build_story(data, path)
+
+def build_story(data, source="story"):
+    """Index and check a story given as a dict
+
+    The dict has "start" (a node id) and "nodes", which maps each id to
+    {"text": ..., "choices": [{"label": ..., "goto": id}, ...]} or to
+    {"text": ..., "ending": true}. "title", "greeting", "intro" and
+    "farewell" are optional.
+    """
+    if not isinstance(data, dict):
+        raise StoryError(f"{source}: the story must be an object, not {type(data).__name__}")
+    raw_nodes = data.get("nodes", {})
+    if not isinstance(raw_nodes, dict):
+        raise StoryError(f"{source}: nodes must be an object mapping ids to nodes, "
+                         f"not {type(raw_nodes).__name__}")
+    ids = list(raw_nodes)
+    index = {node_id: i for i, node_id in enumerate(ids)}
+    problems = []
+
+    start = data.get("start")
+    if not isinstance(start, str) or start not in index:
+        problems.append(f"start node {start!r} does not exist")
+    for field in ("title", "greeting", "intro", "farewell"):
+        value = data.get(field, "")
+        if not isinstance(value, str):
+            problems.append(f"{field} must be a string, not {type(value).__name__}")
+
+    nodes = []
+    for node_id in ids:
+        raw = raw_nodes[node_id]
+        if not isinstance(raw, dict):
+            problems.append(f"node {node_id!r} must be an object, not {type(raw).__name__}")
+            continue
+        text = raw.get("text", "")
+        if not isinstance(text, str):
+            problems.append(f"text of node {node_id!r} must be a string, not {type(text).__name__}")
+        ending = raw.get("ending", False)
+        if not isinstance(ending, bool):
+            problems.append(f"ending of node {node_id!r} must be true or false, not {ending!r}")
+            continue
+        raw_choices = raw.get("choices", [])
+        if not isinstance(raw_choices, list):
+            problems.append(f"choices of node {node_id!r} must be a list, not {type(raw_choices).__name__}")
+            continue
+        if ending and raw_choices:
+            problems.append(f"ending {node_id!r} has choices")
+        elif not ending and not raw_choices:
+            problems.append(f"node {node_id!r} has no choices and is not marked as an ending")
+        choices = []
+        for choice in raw_choices:
+            if not isinstance(choice, dict):
+                problems.append(f"node {node_id!r} has a choice that isn't an object: {choice!r}")
+                continue
+            target = choice.get("goto")
+            if not isinstance(target, str) or target not in index:
+                problems.append(f"node {node_id!r} has a choice leading to missing node {target!r}")
+                continue
+            label = choice.get("label", "")
+            if not isinstance(label, str):
+                problems.append(f"node {node_id!r} has a choice label that isn't a string: {label!r}")
+                continue
+            choices.append((label, index[target]))
+        nodes.append(Node(node_id, text, tuple(choices), ending))
+
+    if not problems:
+        problems.extend(check_graph(nodes, index[start]))
+    if problems:
+        raise StoryError(f"{source}: " + "; ".join(problems))
+
+    return Story(data.get("title", ""), data.get("greeting", ""), data.get("intro", ""),
+                 data.get("farewell", ""), index[start], tuple(nodes), MappingProxyType(index))
+
+def check_graph(nodes, start):
+    """Problems with the shape of the story: unreachable nodes and traps"""
+    problems = []
+
+    # Everything has to be reachable from the start
+    reached = [False] * len(nodes)
+    reached[start] = True
+    queue = deque([start])
+    while queue:
+        for _, target in nodes[queue.popleft()].choices:
+            if not reached[target]:
+                reached[target] = True
+                queue.append(target)
+    unreached = [node.id for node, seen in zip(nodes, reached) if not seen]
+    if unreached:
+        problems.append(f"{len(unreached)} node(s) can't be reached from the start, "
+                        f"e.g. {', '.join(map(repr, unreached[:5]))}")
+
+    # ...and every reachable node has to have some way on to an ending
+    leads_to = [[] for _ in nodes]
+    for i, node in enumerate(nodes):
+        for _, target in node.choices:
+            leads_to[target].append(i)
+    finishes = [node.ending for node in nodes]
+    queue = deque(i for i, node in enumerate(nodes) if node.ending)
+    if not queue:
+        problems.append("the story has no endings")
+        return problems
+    while queue:
+        for source in leads_to[queue.popleft()]:
+            if not finishes[source]:
+                finishes[source] = True
+                queue.append(source)
+    trapped = [node.id for node, seen, done in zip(nodes, reached, finishes) if seen and not done]
+    if trapped:
+        problems.append(f"{len(trapped)} node(s) can never reach an ending, "
+                        f"e.g. {', '.join(map(repr, trapped[:5]))}")
+    return problems
+
+def render_prompt(node):
+    if node.ending:
+        return node.text
+    lines = [node.text.rstrip("\n")]
+    lines.extend(f"{number} - {label}" for number, (label, _) in enumerate(node.choices, 1))
+    return "\n".join(lines) + "\n"
+
+def choose(node, answer):
+    """The node index a typed answer leads to, or None if it isn't a choice"""
+    answer = answer.strip()
+    # isdigit() would pass the likes of "²", which int() refuses
+    if answer.isdecimal() and 1 <= int(answer) <= len(node.choices):
+        return node.choices[int(answer) - 1][1]
+    return None
+
+def retry_message(node):
+    if len(node.choices) == 2:
+        return "please enter 1 or 2"
+    return f"please enter a number from 1 to {len(node.choices)}"
+
+def play(story, read=input, write=print):
+    """Play a story at the terminal; returns the id of the ending reached"""
+    write(story.greeting)
+    write(story.intro)
+    node = story.nodes[story.start]
+    while not node.ending:
+        target = choose(node, read(render_prompt(node)))
+        if target is None:
+            write(retry_message(node))
+        else:
+            node = story.nodes[target]
+    write(node.text)
+    write(story.farewell)
+    return node.id
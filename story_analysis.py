@@ -0,0 +1,271 @@
+import argparse
+import heapq
+import json
+import math
+import sys
+import time
+from collections import deque, namedtuple
+
+from compiled_story import open_story
+from story import STORY_FILE
+
+# shortest and longest count choices made from the start; longest is
+# math.inf when a loop in the story can come before the ending
+EndingReport = namedtuple("EndingReport", ["id", "shortest", "longest", "probability"])
+
+# endings is a list of EndingReport for the endings the start can reach;
+# loops is a list of node-id lists, one per set of nodes that can lead
+# round to each other
+Analysis = namedtuple("Analysis", ["endings", "unreachable_endings", "loops"])
+
+class AnalysisError(ValueError):
+    """Weights the story can't be analyzed with"""
+
+def uniform(node):
+    return [1.0] * len(node.choices)
+
+def analyze(story, weights=uniform):
+    """Reachability, path lengths and ending probabilities for a story
+
+    weights(node) gives the relative chance of each of node's choices
+    being taken. A breadth-first search finds the shortest paths and
+    Tarjan's algorithm finds the loops; both are linear. One pass over
+    the loops in topological order then gives the longest paths and
+    the probabilities. Outside loops that pass is linear too; inside
+    each loop, the chance of leaving by each way out is solved by
+    eliminating the loop's nodes one by one (see loop_exits()), which
+    costs more when many nodes in a loop lead to many others.
+    """
+    nodes = list(story.nodes)
+    targets = [[target for _, target in node.choices] for node in nodes]
+    start = story.start
+
+    # Shortest path: breadth first from the start
+    shortest = [-1] * len(nodes)
+    shortest[start] = 0
+    queue = deque([start])
+    while queue:
+        source = queue.popleft()
+        for target in targets[source]:
+            if shortest[target] < 0:
+                shortest[target] = shortest[source] + 1
+                queue.append(target)
+
+    components = strongly_connected(targets, start)
+    looped = [len(component) > 1 or component[0] in targets[component[0]] for component in components]
+    # Tarjan finds components with everything they lead to found first, so
+    # walking them backwards visits every node after all the ways into it
+    order = range(len(components) - 1, -1, -1)
+
+    # One pass over the components, every one after all the ways into it.
+    # Longest path: each node is one more than the longest way into it, and
+    # anything after a loop could take any number of choices to reach.
+    # Probability: push the chance of being at each node out along its
+    # choices; a loop passes on everything that enters it through its
+    # ways out
+    longest = [-1] * len(nodes)
+    longest[start] = 0
+    chance = [0.0] * len(nodes)
+    chance[start] = 1.0
+    shares = [choice_shares(node, weights) if shortest[i] >= 0 else [] for i, node in enumerate(nodes)]
+    for c in order:
+        component = components[c]
+        if looped[c]:
+            members = set(component)
+            for node in component:
+                longest[node] = math.inf
+            for target, leaving in loop_exits(component, targets, shares, chance, nodes).items():
+                chance[target] += leaving
+        else:
+            members = ()
+            node = component[0]
+            for target, share in zip(targets[node], shares[node]):
+                chance[target] += chance[node] * share
+        for node in component:
+            for target in targets[node]:
+                if target not in members:
+                    longest[target] = max(longest[target], longest[node] + 1)
+
+    endings = []
+    unreachable = []
+    for i, node in enumerate(nodes):
+        if not node.ending:
+            continue
+        if shortest[i] < 0:
+            unreachable.append(node.id)
+        else:
+            endings.append(EndingReport(node.id, shortest[i], longest[i], float(chance[i])))
+    loops = [[nodes[node].id for node in component] for component, has_loop in zip(components, looped) if has_loop]
+    return Analysis(endings, unreachable, loops)
+
+def choice_shares(node, weights):
+    if not node.choices:
+        return []
+    node_weights = [float(weight) for weight in weights(node)]
+    total = sum(node_weights)
+    if len(node_weights) != len(node.choices) or total <= 0 or min(node_weights) < 0:
+        raise AnalysisError(f"bad choice weights {node_weights} for node {node.id!r}")
+    return [weight / total for weight in node_weights]
+
+def loop_exits(component, targets, shares, chance, nodes):
+    """Where the chance of entering a loop leaves it, as {node outside: chance}
+
+    The loop's nodes are taken out one at a time, cheapest first (fewest
+    ways in times ways out), and every choice that led to a removed node
+    is sent on along that node's own choices. Choosing yourself just
+    means choosing again, so a choice that comes back round to where it
+    started is dropped and the rest are scaled back up to 1. That keeps
+    every number a sum of positive shares, with no subtraction to lose
+    precision to, however unlikely leaving is; a loop left with chance
+    2**-100000 per pass still passes on everything that enters it.
+    """
+    remaining = set(component)
+    # Each node's choices, merged by target, with the ones to itself dropped
+    out = {}
+    into = {node: set() for node in component}
+    for node in component:
+        row = {}
+        for target, share in zip(targets[node], shares[node]):
+            if target != node and share > 0:
+                row[target] = row.get(target, 0.0) + share
+        out[node] = row
+        for target in row:
+            if target in remaining:
+                into[target].add(node)
+    entered = {node: chance[node] for node in component}
+    exits = {}
+
+    heap = [(len(into[node]) * len(out[node]), node) for node in component]
+    heapq.heapify(heap)
+    while heap:
+        cost, node = heapq.heappop(heap)
+        if node not in remaining:
+            continue
+        # Costs only grow as neighbours are taken out; retry stale ones later
+        current = len(into[node]) * len(out[node])
+        if current > cost:
+            heapq.heappush(heap, (current, node))
+            continue
+        remaining.discard(node)
+        row = out.pop(node)
+        total = sum(row.values())
+        if total <= 0:
+            raise AnalysisError(f"the loop through {nodes[node].id!r} can never be left "
+                                "with these choice weights")
+
+        # Whatever entered this node moves on along its choices
+        here = entered.pop(node)
+        for target, share in row.items():
+            share /= total
+            row[target] = share
+            if target in remaining:
+                entered[target] += here * share
+                into[target].discard(node)
+                heapq.heappush(heap, (len(into[target]) * len(out[target]), target))
+            else:
+                exits[target] = exits.get(target, 0.0) + here * share
+
+        # ...and so does every choice that led here
+        for source in into.pop(node):
+            source_row = out[source]
+            weight = source_row.pop(node)
+            came_back = False
+            for target, share in row.items():
+                if target == source:
+                    came_back = True
+                    continue
+                source_row[target] = source_row.get(target, 0.0) + weight * share
+                if target in remaining:
+                    into[target].add(source)
+            if came_back:
+                source_total = sum(source_row.values())
+                if source_total > 0:
+                    for target in source_row:
+                        source_row[target] /= source_total
+            heapq.heappush(heap, (len(into[source]) * len(source_row), source))
+    return exits
+
+def strongly_connected(targets, start):
+    """Tarjan's algorithm over everything reachable from start, without recursion
+
+    Each component is returned after every component it leads to.
+    """
+    index = [-1] * len(targets)
+    low = [0] * len(targets)
+    on_stack = [False] * len(targets)
+    stack = []
+    components = []
+    counter = 0
+
+    index[start] = low[start] = counter
+    counter += 1
+    stack.append(start)
+    on_stack[start] = True
+    work = [(start, iter(targets[start]))]
+    while work:
+        node, remaining = work[-1]
+        for target in remaining:
+            if index[target] < 0:
+                index[target] = low[target] = counter
+                counter += 1
+                stack.append(target)
+                on_stack[target] = True
+                work.append((target, iter(targets[target])))
+                break
+            if on_stack[target]:
+                low[node] = min(low[node], index[target])
+        else:
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+    return components
+
+def load_weights(path):
+    """Choice weights from a JSON file mapping node ids to lists of weights;
+    nodes it doesn't mention choose evenly"""
+    with open(path, encoding="utf-8") as file:
+        table = json.load(file)
+    return lambda node: table.get(node.id) or uniform(node)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Which endings a story can reach, how far away and how likely")
+    parser.add_argument("--story", default=STORY_FILE, help="story file, JSON or compiled")
+    parser.add_argument("--weights", default=None,
+                        help="JSON file of {node id: [weight per choice]}; default is every choice equally likely")
+    parser.add_argument("--top", type=int, default=20, help="endings to list, most likely first")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    began = time.perf_counter()
+    story = open_story(args.story)
+    loaded = time.perf_counter()
+    try:
+        analysis = analyze(story, load_weights(args.weights) if args.weights else uniform)
+    except AnalysisError as error:
+        sys.exit(f"{args.story}: {error}")
+    finished = time.perf_counter()
+
+    endings = sorted(analysis.endings, key=lambda ending: -ending.probability)
+    print(f"{len(story.nodes)} nodes, {len(analysis.endings)} reachable endings, "
+          f"{len(analysis.loops)} loop(s); loaded in {loaded - began:.2f}s, analyzed in {finished - loaded:.2f}s")
+    print(f"{'ending':<24}{'chance':>10}{'fewest':>8}{'most':>8}")
+    for ending in endings[:args.top]:
+        most = "any" if ending.longest == math.inf else ending.longest
+        print(f"{ending.id:<24}{ending.probability:>10.4f}{ending.shortest:>8}{most:>8}")
+    if len(endings) > args.top:
+        print(f"... and {len(endings) - args.top} more")
+    for ending in analysis.unreachable_endings:
+        print(f"unreachable ending: {ending}")
+    for loop in analysis.loops[:5]:
+        print("loop: " + " -> ".join(loop[:8]) + (" ..." if len(loop) > 8 else ""))
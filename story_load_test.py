@@ -0,0 +1,127 @@
+import argparse
+import asyncio
+import random
+import re
+import time
+import tracemalloc
+
+from compiled_story import open_story
+from story import STORY_FILE
+from story_server import PROMPT, StoryServer, start
+
+PROMPT_BYTES = PROMPT.encode("utf-8")
+CHOICE_LINE = re.compile(rb"^\d+ - ", re.MULTILINE)
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+class LoadStats:
+    def __init__(self):
+        self.finished = 0
+        self.failed = 0
+        self.answers = 0
+        # Seconds from sending an answer to the next prompt (or the ending) arriving
+        self.latencies = []
+
+    def lines(self, elapsed):
+        ms = [latency * 1000 for latency in self.latencies]
+        return [
+            f"{self.finished} playthroughs finished, {self.failed} failed, in {elapsed:.2f}s",
+            f"{self.answers} answers ({self.answers / elapsed:.0f}/s)",
+            f"answer latency ms: p50 {percentile(ms, 0.5):.2f}  p99 {percentile(ms, 0.99):.2f}  "
+            f"max {max(ms, default=0.0):.2f}",
+        ]
+
+async def connect(host, port, unix):
+    if unix:
+        return await asyncio.open_unix_connection(unix)
+    return await asyncio.open_connection(host, port)
+
+async def player(address, rng, stats, think=0.0, typos=0.0):
+    """Play to an ending choosing at random, sometimes typing nonsense"""
+    try:
+        reader, writer = await connect(*address)
+        text = await reader.readuntil(PROMPT_BYTES)
+        while True:
+            choices = len(CHOICE_LINE.findall(text))
+            if think:
+                await asyncio.sleep(rng.uniform(0, 2 * think))
+            answer = "maybe" if rng.random() < typos else str(rng.randint(1, choices))
+            sent = time.perf_counter()
+            writer.write(answer.encode("utf-8") + b"\n")
+            try:
+                text = await reader.readuntil(PROMPT_BYTES)
+            except asyncio.IncompleteReadError:
+                # The server hangs up after the ending
+                stats.latencies.append(time.perf_counter() - sent)
+                stats.answers += 1
+                break
+            stats.latencies.append(time.perf_counter() - sent)
+            stats.answers += 1
+        writer.close()
+        stats.finished += 1
+    except (ConnectionError, OSError, asyncio.IncompleteReadError):
+        stats.failed += 1
+
+async def idler(address):
+    """Connect and sit on the first question; returns the writer to hang up with"""
+    reader, writer = await connect(*address)
+    await reader.readuntil(PROMPT_BYTES)
+    return writer
+
+async def load_test(args):
+    server = None
+    if args.host is None and args.unix is None:
+        # Nothing to connect to was given, so serve the story in this process
+        if args.trace_memory:
+            tracemalloc.start()
+        server = StoryServer(open_story(args.story))
+        listener = await start(server)
+        address = ("127.0.0.1", listener.sockets[0].getsockname()[1], None)
+    else:
+        address = (args.host, args.port, args.unix)
+
+    idlers = await asyncio.gather(*(idler(address) for _ in range(args.idle)))
+    print(f"{len(idlers)} idle sessions open")
+    if server is not None:
+        # Measured with only the idle sessions connected. The clients live
+        # in this process too, so this is both ends of each connection
+        print("server and clients: " + server.report())
+
+    stats = LoadStats()
+    began = time.perf_counter()
+    await asyncio.gather(*(player(address, random.Random(args.seed + i), stats, args.think, args.typos)
+                           for i in range(args.sessions)))
+    elapsed = time.perf_counter() - began
+    for line in stats.lines(elapsed):
+        print(line)
+
+    for writer in idlers:
+        writer.close()
+    if server is not None:
+        while server.sessions:
+            await asyncio.sleep(0.01)
+        listener.close()
+        await listener.wait_closed()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load test the adventure server with simulated players")
+    parser.add_argument("--sessions", type=int, default=1000, help="players who play through to an ending")
+    parser.add_argument("--idle", type=int, default=1000, help="connections that sit on the first question")
+    parser.add_argument("--think", type=float, default=0.0, help="mean seconds a player waits before answering")
+    parser.add_argument("--typos", type=float, default=0.05, help="chance an answer isn't a valid choice")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--story", default=STORY_FILE,
+                        help="story to serve when no server is given (JSON or compiled)")
+    parser.add_argument("--host", default=None, help="server to test; default is one started in-process")
+    parser.add_argument("--port", type=int, default=8023)
+    parser.add_argument("--unix", default=None, help="test a server on this Unix socket")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="with the in-process server, measure Python heap per session with tracemalloc")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    asyncio.run(load_test(parse_args()))
@@ -0,0 +1,158 @@
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import tracemalloc
+from array import array
+
+from compiled_story import open_story
+from story import STORY_FILE, choose, render_prompt, retry_message
+
+# Sent after every question, so clients (and people on nc) know it's their turn
+PROMPT = "> "
+
+class Session:
+    """One player's place in the story: the node they're at and how they got there"""
+
+    __slots__ = ("node", "history")
+
+    def __init__(self, start):
+        self.node = start
+        # Node indices visited, start included
+        self.history = array("I", [start])
+
+    def move(self, node):
+        self.node = node
+        self.history.append(node)
+
+def memory_in_use():
+    """(bytes, what was measured) for this process right now
+
+    The Python heap when tracemalloc is tracing, which counts exactly what
+    connections allocate; otherwise resident memory, which also catches
+    what asyncio and the sockets hold outside Python objects but moves in
+    whole pages and only shrinks when the allocator gives memory back.
+    """
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0], "heap"
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE"), "RSS"
+    except (OSError, ValueError):
+        return None, "RSS"
+
+class StoryServer:
+    """Plays one story to any number of players at once, one Session each"""
+
+    def __init__(self, story):
+        self.story = story
+        self.sessions = set()
+        self.served = 0
+        self.finished = 0
+        # Memory with the story loaded and nobody connected; what a report
+        # finds on top of this is put down to the open sessions
+        self.baseline = memory_in_use()[0]
+
+    async def handle(self, reader, writer):
+        session = Session(self.story.start)
+        self.sessions.add(session)
+        self.served += 1
+        try:
+            await self.play(session, reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # The server is shutting down; nothing is waiting on this task
+            pass
+        finally:
+            self.sessions.discard(session)
+            writer.close()
+
+    async def play(self, session, reader, writer):
+        """story.play(), with the player on the other end of a socket"""
+        story = self.story
+        send(writer, story.greeting, story.intro)
+        node = story.nodes[session.node]
+        while not node.ending:
+            writer.write((render_prompt(node) + PROMPT).encode("utf-8"))
+            await writer.drain()
+            try:
+                line = await reader.readline()
+            except ValueError:
+                # readline() refuses a line longer than the stream limit (64 KiB);
+                # nobody types that, so hang up rather than buffer it
+                return
+            if not line:
+                return
+            target = choose(node, line.decode("utf-8", "replace"))
+            if target is None:
+                send(writer, retry_message(node))
+            else:
+                session.move(target)
+                node = story.nodes[target]
+        send(writer, node.text, story.farewell)
+        await writer.drain()
+        self.finished += 1
+
+    def report(self):
+        open_sessions = len(self.sessions)
+        # Everything a connection costs: its Session, the task, the stream
+        # reader and writer, the transport and their buffers
+        in_use, what = memory_in_use()
+        if in_use is None or self.baseline is None:
+            per_session = "unknown"
+        else:
+            grown = in_use - self.baseline
+            per_session = f"{grown / open_sessions:,.0f} bytes" if open_sessions else "n/a"
+        # ru_maxrss is in kilobytes on Linux
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return (f"{open_sessions} open, {self.served} served, {self.finished} finished; "
+                f"{per_session} of {what} per open session; peak RSS {peak:.1f} MB")
+
+def send(writer, *lines):
+    writer.write("".join(line + "\n" for line in lines).encode("utf-8"))
+
+async def start(server, host="127.0.0.1", port=0, unix=None):
+    """Listen on a Unix socket if one is given, otherwise on TCP"""
+    if unix:
+        return await asyncio.start_unix_server(server.handle, path=unix, backlog=4096)
+    return await asyncio.start_server(server.handle, host, port, backlog=4096)
+
+async def report_every(server, seconds):
+    while True:
+        await asyncio.sleep(seconds)
+        print(server.report(), file=sys.stderr)
+
+async def serve(args):
+    if args.trace_memory:
+        tracemalloc.start()
+    server = StoryServer(open_story(args.story))
+    listener = await start(server, args.host, args.port, args.unix)
+    where = args.unix or "{}:{}".format(*listener.sockets[0].getsockname()[:2])
+    print(f"serving {args.story} on {where}", file=sys.stderr)
+    if args.report:
+        asyncio.create_task(report_every(server, args.report))
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        print(server.report(), file=sys.stderr)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve the adventure to many players at once")
+    parser.add_argument("--story", default=STORY_FILE, help="story file, JSON or compiled")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8023)
+    parser.add_argument("--unix", default=None, help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--report", type=float, default=10.0,
+                        help="seconds between session/memory reports (0 for none)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="report Python heap per session with tracemalloc (slower) instead of RSS")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(serve(parse_args()))
+    except KeyboardInterrupt:
+        pass
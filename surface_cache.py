@@ -0,0 +1,144 @@
+import hashlib
+import mmap
+import os
+import struct
+import zlib
+
+import pygame
+
+# Shared by both games; every key says which game and art version it is for
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "bug-games")
+# The oldest files are deleted once the cache grows past this
+MAX_BYTES = 128 * 1024 * 1024
+
+MAGIC = b"SURF"
+VERSION = 1
+FORMATS = ("RGB", "RGBA")
+# magic, version, pixel format, has color key, color key, width, height,
+# offset x, offset y, CRC of the pixels
+HEADER = struct.Struct("<4sBB?3sxxIIiiI")
+SUFFIX = ".px"
+
+class SurfaceCache:
+    """Rendered surfaces kept on disk as raw pixel files, named by a hash of their key
+
+    A key is a tuple of everything the picture depends on: the game, its
+    art version, the seed, size and fade level. A file that fails its
+    checks is deleted and drawn again, and the least recently used files
+    go once the cache is bigger than max_bytes.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(repr(key).encode()).hexdigest()[:32] + SUFFIX)
+
+    def get(self, key, build):
+        """(surface, offset x, offset y) for key, loaded from disk or made by build() and saved"""
+        path = self.path(key)
+        entry = self.load(path)
+        if entry is None:
+            entry = build()
+            self.save(path, *entry)
+        return entry
+
+    def surface(self, key, build):
+        """Like get() for a surface with no offset; build() returns just the surface"""
+        return self.get(key, lambda: (build(), 0, 0))[0]
+
+    def load(self, path):
+        try:
+            with open(path, "rb") as file:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Missing, or an empty file, which mmap refuses
+            return None
+        try:
+            entry = self.read(data)
+        finally:
+            data.close()
+        if entry is None:
+            self.discard(path)
+            return None
+        # Touch it, so eviction sees it as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    @staticmethod
+    def read(data):
+        if len(data) < HEADER.size:
+            return None
+        magic, version, pixel_format, has_key, key, width, height, offset_x, offset_y, crc = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION or pixel_format >= len(FORMATS):
+            return None
+        pixel_format = FORMATS[pixel_format]
+        if len(data) != HEADER.size + width * height * len(pixel_format):
+            return None
+
+        pixels = memoryview(data)[HEADER.size:]
+        try:
+            if zlib.crc32(pixels) != crc:
+                return None
+            # frombuffer reads the mapped pixels in place; copy() gives the
+            # surface its own memory so the file can be closed
+            surface = pygame.image.frombuffer(pixels, (width, height), pixel_format).copy()
+        finally:
+            pixels.release()
+        if has_key:
+            surface.set_colorkey(tuple(key))
+        return surface, offset_x, offset_y
+
+    def save(self, path, surface, offset_x=0, offset_y=0):
+        alpha = bool(surface.get_flags() & pygame.SRCALPHA)
+        pixel_format = "RGBA" if alpha else "RGB"
+        pixels = pygame.image.tobytes(surface, pixel_format)
+        key = surface.get_colorkey()
+        header = HEADER.pack(MAGIC, VERSION, FORMATS.index(pixel_format), key is not None,
+                             bytes(key[:3]) if key else b"\0\0\0", surface.get_width(), surface.get_height(),
+                             offset_x, offset_y, zlib.crc32(pixels))
+        # Write then rename, so a crash never leaves half a file under the real name
+        temporary = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, "wb") as file:
+                file.write(header)
+                file.write(pixels)
+            os.replace(temporary, path)
+        except OSError:
+            # A full or read-only disk just means no caching
+            self.discard(temporary)
+            return
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(SUFFIX):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self.discard(os.path.join(self.directory, name))
+            total -= size
+
+    @staticmethod
+    def discard(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(SUFFIX):
+                self.discard(os.path.join(self.directory, name))
@@ -0,0 +1,24 @@
+import random
+
+import pygame
+
+import bug_collecting
+from bug_collecting import BugCollectingGame
+from bug_sprites import SpriteAtlas
+
+def drawn_at(game, alpha):
+    """The areas the game's bugs are drawn to at alpha"""
+    sprites = SpriteAtlas(bug_collecting.draw_bug, levels=31)
+    surface = pygame.Surface((bug_collecting.WIDTH, bug_collecting.HEIGHT))
+    return sprites.draw_swarm(surface, game.bugs, rects=True, alpha=game.draw_alpha(alpha))
+
+def test_paused_bugs_stay_put():
+    game = BugCollectingGame(random.Random(2))
+    game.start()
+    for _ in range(30):
+        game.move_bugs()
+    # Moving bugs are drawn partway between steps
+    assert drawn_at(game, 0.0) != drawn_at(game, 1.0)
+    game.press("space")
+    assert not game.playing
+    assert drawn_at(game, 0.0) == drawn_at(game, 0.5) == drawn_at(game, 1.0)
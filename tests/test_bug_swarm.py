@@ -0,0 +1,154 @@
+import random
+
+import numpy as np
+import pytest
+
+import bug_swarm
+from bug_collecting import BUG_TYPES, HEIGHT, WIDTH, Bug
+from bug_swarm import BugSwarm
+
+def make_swarm(count, seed=0):
+    """A swarm of count bugs of random types at random places"""
+    swarm = BugSwarm(BUG_TYPES, WIDTH, HEIGHT, view_class=Bug)
+    rng = random.Random(seed)
+    for _ in range(count):
+        bug_type = rng.choice(swarm.type_names)
+        swarm.spawn(bug_type, rng.randint(50, WIDTH - 50), rng.randint(50, HEIGHT - 50), 0, rng)
+    return swarm
+
+@pytest.fixture
+def swarm_pair():
+    """Two swarms built the same way, to run side by side"""
+    return make_swarm(300, seed=5), make_swarm(300, seed=5)
+
+def same_rows(a, b):
+    assert a.count == b.count
+    for column_a, column_b in zip(a._columns(), b._columns()):
+        assert np.array_equal(column_a[:a.count], column_b[:b.count])
+
+class SteppedModel:
+    """Every bug moved and wall-checked every step, the way the swarm used to work"""
+
+    def __init__(self, swarm):
+        x, y = swarm.positions()
+        self.x = list(x)
+        self.y = list(y)
+        self.speed_x = swarm.speed_x[:swarm.count].tolist()
+        self.speed_y = swarm.speed_y[:swarm.count].tolist()
+        self.size = swarm._size[:swarm.count].tolist()
+        self.width = swarm.width
+        self.height = swarm.height
+
+    def update(self):
+        for i, size in enumerate(self.size):
+            self.x[i] += self.speed_x[i]
+            self.y[i] += self.speed_y[i]
+            if self.x[i] < size or self.x[i] > self.width - size:
+                self.speed_x[i] = -self.speed_x[i]
+            if self.y[i] < size or self.y[i] > self.height - size:
+                self.speed_y[i] = -self.speed_y[i]
+            self.x[i] = max(min(self.x[i], self.width - size), size)
+            self.y[i] = max(min(self.y[i], self.height - size), size)
+
+    def remove(self, index):
+        for column in (self.x, self.y, self.speed_x, self.speed_y, self.size):
+            column[index] = column[-1]
+            column.pop()
+
+def test_events_match_stepped_model():
+    swarm = make_swarm(200, seed=1)
+    model = SteppedModel(swarm)
+    rng = random.Random(2)
+    for step in range(3000):
+        if step % 100 == 99:
+            index = rng.randrange(swarm.count)
+            swarm.remove(index)
+            model.remove(index)
+        swarm.update()
+        model.update()
+        x, y = swarm.positions()
+        assert np.allclose(x, model.x, rtol=0, atol=1e-6)
+        assert np.allclose(y, model.y, rtol=0, atol=1e-6)
+        # Every bounce lands on the same step
+        assert np.array_equal(np.sign(swarm.speed_x[:swarm.count]), np.sign(model.speed_x))
+        assert np.array_equal(np.sign(swarm.speed_y[:swarm.count]), np.sign(model.speed_y))
+
+def test_batched_bounces_match_one_at_a_time(swarm_pair, monkeypatch):
+    batched, single = swarm_pair
+    rng = random.Random(3)
+    for step in range(2000):
+        if step % 50 == 49:
+            # Removals leave stale and repeated hits in the queue
+            index = rng.randrange(batched.count)
+            batched.remove(index)
+            single.remove(index)
+        monkeypatch.setattr(bug_swarm, "BATCH_BOUNCES", 1)
+        batched.update()
+        monkeypatch.setattr(bug_swarm, "BATCH_BOUNCES", 1 << 30)
+        single.update()
+        same_rows(batched, single)
+
+def topmost_under(swarm, px, py):
+    """bug_at() done by checking every bug"""
+    x, y = swarm.positions()
+    size = swarm._size[:swarm.count]
+    hits = np.flatnonzero((x - px) ** 2 + (y - py) ** 2 <= size * size)
+    return int(hits.max()) if len(hits) else None
+
+@pytest.mark.parametrize("count", [10, 300])
+def test_grid_finds_moving_bugs(count):
+    swarm = make_swarm(count, seed=7)
+    rng = random.Random(4)
+    for step in range(1500):
+        if step % 25 == 0:
+            swarm.remove(rng.randrange(swarm.count))
+        if step % 25 == 5:
+            # Leaves nothing to move into its row
+            removed = swarm[-1]
+            px, py = removed.x, removed.y
+            swarm.remove(removed.index)
+            assert (swarm.grid.near(px, py, swarm.time) < swarm.count).all()
+        if step % 25 in (10, 15):
+            swarm.spawn("ant", rng.uniform(50, 750), rng.uniform(50, 550), 0, rng)
+        if step % 25 == 20:
+            bug = swarm[rng.randrange(swarm.count)]
+            bug.x = rng.uniform(50, 750)
+            bug.speed_y = rng.uniform(-30, 30)
+        if step % 2:
+            swarm.update()
+        # Near a bug's edge, so misses and overlaps both come up
+        bug = swarm[rng.randrange(swarm.count)]
+        angle = rng.uniform(0, 2 * np.pi)
+        reach = bug.size * rng.uniform(0.9, 1.1)
+        px, py = bug.x + reach * np.cos(angle), bug.y + reach * np.sin(angle)
+        found = swarm.bug_at((px, py))
+        assert (None if found is None else found.index) == topmost_under(swarm, px, py)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_collect_rows_matches_bug_at_then_remove(swarm_pair, seed):
+    batch, each = swarm_pair
+    for swarm in swarm_pair:
+        for _ in range(37):
+            swarm.update()
+    rng = random.Random(seed)
+    # Clicks bunched around a few bugs, so later clicks land on bugs that
+    # earlier ones moved or removed
+    x, y = batch.positions()
+    points = []
+    for row in rng.sample(range(batch.count), 10):
+        for _ in range(6):
+            points.append((x[row] + rng.uniform(-12, 12), y[row] + rng.uniform(-12, 12)))
+
+    rows = batch.collect_rows(points)
+    for row in rows:
+        if row is not None:
+            batch.remove(row)
+    expected = []
+    for point in points:
+        bug = each.bug_at(point)
+        expected.append(None if bug is None else bug.index)
+        if bug is not None:
+            each.remove(bug.index)
+    assert rows == expected
+    assert any(row is not None for row in rows)
+    same_rows(batch, each)
@@ -0,0 +1,32 @@
+import json
+import random
+
+import pytest
+
+from bug_collecting import BUG_COLORS, HEIGHT, RULES, RULES_FILE, WIDTH, BugCollectingGame
+from game_rules import RulesError, build_rules, with_max_bugs
+
+def rules_data(**changes):
+    with open(RULES_FILE, encoding="utf-8") as file:
+        data = json.load(file)
+    data.update(changes)
+    return data
+
+def test_rules_file_builds():
+    assert build_rules(rules_data(), BUG_COLORS, WIDTH, HEIGHT) == RULES
+
+@pytest.mark.parametrize("count", [True, -1, 1.5])
+def test_start_extra_count_must_be_a_whole_number(count):
+    with pytest.raises(RulesError, match="start_extra"):
+        build_rules(rules_data(start_extra={"ant": count}), BUG_COLORS, WIDTH, HEIGHT)
+
+@pytest.mark.parametrize("max_bugs", [-1, 0, True, 2.0])
+def test_max_bugs_override_is_checked(max_bugs):
+    with pytest.raises(RulesError, match="max_bugs"):
+        with_max_bugs(RULES, max_bugs)
+    with pytest.raises(RulesError, match="max_bugs"):
+        BugCollectingGame(random.Random(0), max_bugs)
+
+def test_max_bugs_override():
+    assert with_max_bugs(RULES, 7).max_bugs == 7
+    assert BugCollectingGame(random.Random(0), 7).bugs.capacity == 7
@@ -0,0 +1,67 @@
+import pytest
+
+from bug_collecting import RULES
+from headless import HeadlessSession
+from replay import HEADER, InputRecorder, Replay, state_digest
+
+# Never won, so the game keeps going for the whole recording
+ENDLESS = RULES._replace(win_score=None, break_score=None, max_bugs=500, spawn_delay=5)
+
+def record(path, steps, seed=11, snapshot_every=200):
+    """Play a session with the random clicker, recording it; returns the game"""
+    session = HeadlessSession(seed, rules=ENDLESS)
+    recorder = InputRecorder(path, seed, ENDLESS, snapshot_every)
+    while session.frame < steps:
+        for action in session.policy(session.game, session.frame):
+            recorder.record(session.frame, action)
+            session.apply(action)
+        session.game.step()
+        session.frame += 1
+        recorder.stepped(session.frame, session.game)
+    recorder.close(session.frame, session.game)
+    return session.game
+
+@pytest.fixture(scope="module")
+def log(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("replay") / "session.log")
+    game = record(path, 2000)
+    return path, state_digest(game)
+
+def test_replay_matches_recording(log):
+    path, digest = log
+    replay = Replay(path, ENDLESS)
+    replay.run()
+    assert replay.diverged_at is None
+    assert replay.matches()
+    assert state_digest(replay.game) == digest
+
+@pytest.mark.parametrize("step", [0, 199, 200, 201, 1234, 2000])
+def test_seek_from_log_matches_simulating(log, step):
+    path, _ = log
+    fast = Replay(path, ENDLESS)
+    fast.seek(step)
+    slow = Replay(path, ENDLESS)
+    slow.seek(step, from_log=False)
+    assert fast.steps == slow.steps == step
+    assert state_digest(fast.game) == state_digest(slow.game)
+    # And they carry on the same from there
+    for _ in range(150):
+        if fast.finished:
+            break
+        fast.step()
+        slow.step()
+    assert state_digest(fast.game) == state_digest(slow.game)
+
+def test_replay_of_a_different_game_diverges(log, tmp_path):
+    path, _ = log
+    with open(path, "rb") as file:
+        data = file.read()
+    magic, version, seed, max_bugs, rules_crc = HEADER.unpack_from(data)
+    # The same inputs played into a game with another seed
+    changed = tmp_path / "changed.log"
+    changed.write_bytes(HEADER.pack(magic, version, seed + 1, max_bugs, rules_crc) + data[HEADER.size:])
+    replay = Replay(str(changed), ENDLESS)
+    replay.run()
+    # Caught at the first snapshot in the log, not just at the end
+    assert replay.diverged_at == 200
+    assert not replay.matches()
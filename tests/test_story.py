@@ -0,0 +1,55 @@
+import copy
+import glob
+import os
+
+import pytest
+
+from story import StoryError, build_story, choose, load_story
+
+STORIES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "stories")
+
+STORY = {
+    "title": "Two doors",
+    "start": "hall",
+    "nodes": {
+        "hall": {"text": "Two doors.", "choices": [{"label": "Left", "goto": "left"},
+                                                   {"label": "Right", "goto": "right"}]},
+        "left": {"text": "A garden.", "ending": True},
+        "right": {"text": "A cellar.", "ending": True},
+    },
+}
+
+def broken(change):
+    """A copy of STORY with change(story) applied"""
+    story = copy.deepcopy(STORY)
+    change(story)
+    return story
+
+@pytest.mark.parametrize("path", sorted(glob.glob(os.path.join(STORIES, "*.json"))))
+def test_shipped_stories_load(path):
+    load_story(path)
+
+def test_story_loads():
+    story = build_story(STORY)
+    hall = story.nodes[story.start]
+    assert hall.text == "Two doors."
+    assert [label for label, _ in hall.choices] == ["Left", "Right"]
+
+@pytest.mark.parametrize("change, named", [
+    (lambda story: story["nodes"]["left"].update(text=5), "'left'"),
+    (lambda story: story["nodes"]["hall"]["choices"][1].update(label=["Right"]), "'hall'"),
+    (lambda story: story["nodes"]["right"].update(ending="no"), "'right'"),
+    (lambda story: story["nodes"]["right"].update(ending=1), "'right'"),
+    (lambda story: story.update(title=None), "title"),
+    (lambda story: story["nodes"]["hall"]["choices"][0].update(goto="attic"), "'attic'"),
+], ids=["text", "label", "ending string", "ending number", "title", "goto"])
+def test_malformed_story_is_rejected(change, named):
+    with pytest.raises(StoryError, match=named):
+        build_story(broken(change))
+
+@pytest.mark.parametrize("answer, chosen", [("1", "left"), (" 2\n", "right"), ("3", None), ("²", None),
+                                            ("+1", None), ("one", None)])
+def test_choose(answer, chosen):
+    story = build_story(STORY)
+    target = choose(story.nodes[story.start], answer)
+    assert (None if target is None else story.nodes[target].id) == chosen
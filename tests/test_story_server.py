@@ -0,0 +1,33 @@
+import asyncio
+
+from story import build_story
+from story_server import PROMPT, StoryServer, start
+from test_story import STORY
+
+async def talk(lines):
+    """Send each line after a prompt; returns everything the server sent and the server"""
+    server = StoryServer(build_story(STORY))
+    listener = await start(server)
+    reader, writer = await asyncio.open_connection("127.0.0.1", listener.sockets[0].getsockname()[1])
+    received = b""
+    for line in lines:
+        received += await reader.readuntil(PROMPT.encode())
+        writer.write(line)
+    received += await reader.read()
+    writer.close()
+    while server.sessions:
+        await asyncio.sleep(0.01)
+    listener.close()
+    await listener.wait_closed()
+    return received.decode("utf-8"), server
+
+def test_server_plays_to_an_ending():
+    received, server = asyncio.run(talk([b"\xc2\xb2\n", b"2\n"]))
+    assert "please enter 1 or 2" in received
+    assert "A cellar." in received
+    assert server.finished == 1
+
+def test_server_hangs_up_on_an_over_long_line():
+    received, server = asyncio.run(talk([b"1" * 100_000 + b"\n"]))
+    assert "A garden." not in received
+    assert server.finished == 0
@@ -0,0 +1,38 @@
+from collections import OrderedDict
+
+import pygame
+
+
+class TextCache:
+    """Rendered text, overlays and whole screens kept in a bounded LRU"""
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def get(self, key, build):
+        """The cached value for key, calling build() to make it on a miss"""
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        value = build()
+        self.entries[key] = value
+        if len(self.entries) > self.max_entries:
+            # Drop the least recently used entry
+            self.entries.popitem(last=False)
+        return value
+
+    def text(self, font, text, color):
+        # Font objects hash by identity, so each loaded font gets its own entries
+        return self.get(("text", font, text, color),
+                        lambda: font.render(text, True, color))
+
+    def overlay(self, size, color, alpha):
+        def build():
+            surface = pygame.Surface(size, pygame.SRCALPHA)
+            surface.fill((color[0], color[1], color[2], alpha))
+            return surface
+        return self.get(("overlay", size, color, alpha), build)
+
+    def clear(self):
+        self.entries.clear()
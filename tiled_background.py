@@ -0,0 +1,151 @@
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pygame
+
+from bug_collecting import BROWN, HEIGHT, WIDTH
+
+# Dirt patches and rocks per WIDTH x HEIGHT of field; bigger fields get
+# proportionally more so the texture looks the same at any size
+PATCHES = 100
+ROCKS = 30
+# Side of the square tiles the field is split into
+TILE = 256
+
+def background_circles(size, seed):
+    """Every circle in the background, in drawing order, as (x, y, radius, color)
+
+    Uses the seeded rng in the same order draw_background() in
+    bug_collecting.py does, so at WIDTH x HEIGHT the result is the
+    same picture the game draws for that seed.
+    """
+    width, height = size
+    rng = random.Random(seed)
+    scale = width * height / (WIDTH * HEIGHT)
+    circles = []
+
+    # Texture with darker brown patches
+    for _ in range(round(PATCHES * scale)):
+        x = rng.randint(0, width)
+        y = rng.randint(0, height)
+        radius = rng.randint(20, 60)
+        darkness = rng.randint(0, 30)
+        circles.append((x, y, radius, (BROWN[0] - darkness, BROWN[1] - darkness, BROWN[2] - darkness)))
+
+    # Rocks, each with a highlight
+    for _ in range(round(ROCKS * scale)):
+        x = rng.randint(0, width)
+        y = rng.randint(0, height)
+        radius = rng.randint(10, 30)
+        gray = rng.randint(80, 140)
+        circles.append((x, y, radius, (gray, gray, gray)))
+        circles.append((x - radius//3, y - radius//3, radius//3, (gray + 30, gray + 30, gray + 30)))
+    return circles
+
+def tiles(size, circles, tile=TILE):
+    """(rect, circles touching it) for each tile, circles in drawing order"""
+    width, height = size
+    columns = (width + tile - 1) // tile
+    rows = (height + tile - 1) // tile
+    touching = [[] for _ in range(columns * rows)]
+    for circle in circles:
+        x, y, radius, _ = circle
+        for row in range(max(0, (y - radius) // tile), min(rows - 1, (y + radius) // tile) + 1):
+            for column in range(max(0, (x - radius) // tile), min(columns - 1, (x + radius) // tile) + 1):
+                touching[row * columns + column].append(circle)
+    return [((column * tile, row * tile, min(tile, width - column * tile), min(tile, height - row * tile)),
+             touching[row * columns + column])
+            for row in range(rows) for column in range(columns)]
+
+# Set in each worker process by start_worker, so every tile is drawn
+# straight into the parent's buffer
+_pixels = None
+_shared = None
+
+def start_worker(name, size):
+    global _pixels, _shared
+    _shared = shared_memory.SharedMemory(name=name)
+    _pixels = np.ndarray((size[1], size[0]), dtype=np.uint32, buffer=_shared.buf)
+
+def draw_tile(task, pixels=None):
+    """Draw one tile's circles into its part of pixels
+
+    Circles are drawn at integer offsets, which pygame rasterizes
+    exactly as it would on the whole field, so tiles meet without seams.
+    """
+    (left, top, width, height), circles = task
+    pixels = _pixels if pixels is None else pixels
+    surface = pygame.Surface((width, height))
+    surface.fill(BROWN)
+    for x, y, radius, color in circles:
+        pygame.draw.circle(surface, color, (x - left, y - top), radius)
+    # Whole 32-bit pixels, row by row, as pygame stores them
+    pixels[top:top + height, left:left + width] = pygame.surfarray.pixels2d(surface).T
+
+def generate_background(size, seed, workers=None, tile=TILE):
+    """The background for a field of any size, as a Surface
+
+    Tiles are drawn by a pool of worker processes into one shared
+    memory buffer. Every tile depends only on the seed, so the result is
+    the same for any number of workers.
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = tiles(size, background_circles(size, seed), tile)
+    if workers == 1 or len(tasks) == 1:
+        pixels = np.empty((size[1], size[0]), dtype=np.uint32)
+        for task in tasks:
+            draw_tile(task, pixels)
+        return to_surface(pixels)
+
+    shared = shared_memory.SharedMemory(create=True, size=size[0] * size[1] * 4)
+    try:
+        with ProcessPoolExecutor(workers, initializer=start_worker, initargs=(shared.name, size)) as pool:
+            # Big chunks keep the per-task overhead down; tiles are all alike
+            list(pool.map(draw_tile, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+        pixels = np.ndarray((size[1], size[0]), dtype=np.uint32, buffer=shared.buf)
+        background = to_surface(pixels)
+        # The buffer can't be closed while an array still points into it
+        del pixels
+        return background
+    finally:
+        shared.close()
+        shared.unlink()
+
+def to_surface(pixels):
+    # Same pixel format the tiles were drawn in, so this is a straight copy
+    surface = pygame.Surface((pixels.shape[1], pixels.shape[0]))
+    pygame.surfarray.pixels2d(surface)[...] = pixels.T
+    return surface
+
+def parse_size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Draw a dirt and rocks background of any size in parallel")
+    parser.add_argument("--size", type=parse_size, default=(3840, 2160), help="WIDTHxHEIGHT")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--tile", type=int, default=TILE, help="tile side in pixels")
+    parser.add_argument("--out", default=None, help="save the background as an image")
+    parser.add_argument("--check", action="store_true",
+                        help="also draw it with one worker and one tile and compare")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    start = time.perf_counter()
+    background = generate_background(args.size, args.seed, args.workers, args.tile)
+    elapsed = time.perf_counter() - start
+    print(f"{args.size[0]}x{args.size[1]} in {elapsed:.2f}s")
+    if args.check:
+        whole = generate_background(args.size, args.seed, workers=1, tile=max(args.size))
+        same = np.array_equal(pygame.surfarray.pixels2d(background), pygame.surfarray.pixels2d(whole))
+        print("identical to drawing it whole" if same else "DIFFERS from drawing it whole")
+    if args.out:
+        pygame.image.save(background, args.out)
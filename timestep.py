@@ -0,0 +1,25 @@
+class FixedTimestep:
+    """Steps the simulation at a fixed rate, whatever rate frames are drawn at"""
+
+    def __init__(self, step_rate=60, max_substeps=5):
+        self.step_time = 1.0 / step_rate
+        # After a stall, catch up at most this many steps in one frame and
+        # drop the rest, so one slow frame can't snowball into more
+        self.max_substeps = max_substeps
+        self.accumulator = 0.0
+
+    def advance(self, elapsed):
+        """Add elapsed seconds; returns how many steps to run this frame"""
+        self.accumulator += elapsed
+        steps = int(self.accumulator / self.step_time)
+        if steps > self.max_substeps:
+            steps = self.max_substeps
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= steps * self.step_time
+        return steps
+
+    @property
+    def alpha(self):
+        """How far between the last two steps the current frame falls, 0 to 1"""
+        return min(self.accumulator / self.step_time, 1.0)